@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+backfill_history.py
+- Yahoo chart 의 range=5y 한계를 넘어 상장일(inception)~오늘 전체 일봉을
+  period1/period2 구간(chunk)으로 나눠 병렬(상한 있음)로 받아서
+  data/history/daily/YYYY-MM-DD.json 히스토리 저장소에 병합
+- 인접 chunk 는 OVERLAP_DAYS 만큼 겹치게 받아서 겹치는 날짜의 종가가
+  일치하는지 검증 (불일치면 중단)
+- 기존 저장소 + 새 chunk 들을 날짜순 한 번의 merge 로 합치고,
+  내용이 바뀐 날짜 파일만 다시 씀
+- 저장소가 이미 있으면 마지막 날짜 - OVERLAP_DAYS 부터 tail 만 받음 (FULL=1 이면 전체)
+  단, 이벤트 파일이 상장일부터 온전하지 않으면(없음/이전 형식) 전체
+- 저장된 분배금/분할 전체로 행마다 adj_close / tr_close 를 다시 계산해서 같이 저장
+  (fetch_jepq.apply_adjustments 와 같은 정의, 새 분배금이 생기면 이전 행 값도 바뀜)
+
+출력:
+- data/history/daily/YYYY-MM-DD.json  (fetch_history.py 형식 + adj_close / tr_close)
+- data/history/dividends.json  (dividends + splits)
+"""
+
+import os
+import sys
+import json
+import glob
+import heapq
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_jepq import fetch_chart, parse_splits, apply_adjustments, iso_from_unix, ensure_dir
+
+TICKER = os.environ.get("TICKER", "JEPQ").upper()
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "data/history/daily")
+DIVIDENDS_PATH = os.environ.get("DIVIDENDS_PATH", "data/history/dividends.json")
+INCEPTION = os.environ.get("INCEPTION", "")      # YYYY-MM-DD, 비우면 Yahoo meta.firstTradeDate
+FULL = os.environ.get("FULL", "") == "1"
+
+CHUNK_DAYS = int(os.environ.get("CHUNK_DAYS", "365"))
+OVERLAP_DAYS = int(os.environ.get("OVERLAP_DAYS", "10"))
+MAX_PARALLEL = int(os.environ.get("MAX_PARALLEL", "4"))
+CLOSE_TOL = 1e-4   # 겹치는 날짜 종가 상대오차 허용치
+
+DAY = 24 * 60 * 60
+
+
+def unix_from_iso(d):
+    return int(datetime.datetime.strptime(d, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+# -------------------------
+# store
+# -------------------------
+def load_store():
+    """{date: row} (날짜순)"""
+    rows = {}
+    for f in sorted(glob.glob(os.path.join(HISTORY_DIR, "*.json"))):
+        try:
+            with open(f, encoding="utf-8") as fp:
+                j = json.load(fp)
+        except Exception:
+            # 깨진 파일은 다시 받으면 덮어써짐
+            continue
+        d = j.get("date") or os.path.splitext(os.path.basename(f))[0]
+        rows[d] = j
+    return rows
+
+
+def to_row(bar):
+    return {
+        "date": iso_from_unix(bar["time"]),
+        "open": bar["open"],
+        "high": bar["high"],
+        "low": bar["low"],
+        "close": bar["close"],
+        "volume": int(bar["volume"]),
+    }
+
+
+def add_adjusted(merged, dividends, splits):
+    """
+    merged({date: row}, 날짜순) 행마다 adj_close / tr_close 추가.
+    행/이벤트 시각을 모두 날짜 00:00 UTC 로 맞춰서 ex-date 가 같은 날 행에 걸리게 함
+    """
+    dates = list(merged)
+    series = [{"time": unix_from_iso(d), "close": merged[d]["close"]} for d in dates]
+    apply_adjustments(
+        series,
+        [dict(dv, time=unix_from_iso(dv["date"])) for dv in dividends],
+        [dict(sp, time=unix_from_iso(sp["date"])) for sp in splits],
+    )
+    for d, s in zip(dates, series):
+        merged[d]["adj_close"] = round(s["adj_close"], 6)
+        merged[d]["tr_close"] = round(s["tr_close"], 6)
+
+
+# -------------------------
+# chunks
+# -------------------------
+def plan_chunks(start_ts, end_ts):
+    """[start, end] 를 CHUNK_DAYS 단위로 자르고 OVERLAP_DAYS 만큼 겹치게"""
+    chunks = []
+    p1 = start_ts
+    while p1 < end_ts:
+        p2 = min(p1 + (CHUNK_DAYS + OVERLAP_DAYS) * DAY, end_ts)
+        chunks.append((p1, p2))
+        if p2 >= end_ts:
+            break
+        p1 += CHUNK_DAYS * DAY
+    return chunks
+
+
+def fetch_chunks(chunks):
+    def one(span):
+        r0, series, dividends = fetch_chart(TICKER, period1=span[0], period2=span[1])
+        return [to_row(b) for b in series], dividends, parse_splits(r0)
+
+    with ThreadPoolExecutor(max_workers=max(1, MAX_PARALLEL)) as ex:
+        return list(ex.map(one, chunks))
+
+
+def check_overlap(a_rows, b_rows, label):
+    """두 날짜순 row 리스트의 겹치는 날짜 종가 비교 → 불일치 날짜 목록"""
+    bad = []
+    b_close = {r["date"]: r["close"] for r in b_rows}
+    for r in a_rows:
+        c = b_close.get(r["date"])
+        if c is None:
+            continue
+        if abs(r["close"] - c) > CLOSE_TOL * max(abs(c), 1e-9):
+            bad.append(f"{label} {r['date']}: {r['close']} != {c}")
+    return bad
+
+
+def resolve_inception():
+    if INCEPTION:
+        return unix_from_iso(INCEPTION)
+    r0, _, _ = fetch_chart(TICKER, range_="5d")
+    first = (r0.get("meta") or {}).get("firstTradeDate")
+    if not first:
+        raise RuntimeError("No firstTradeDate in chart meta (set INCEPTION=YYYY-MM-DD).")
+    return int(first)
+
+
+# -------------------------
+# events / fetch
+# -------------------------
+def load_events():
+    """
+    (dividends{date: dv}, splits{date: sp}, complete)
+    complete 는 상장일부터 받은 이벤트 목록인지 — full 모드로 한 번이라도 저장된 파일만 True
+    (fetch_history.py 로 만든 저장소엔 이벤트 파일이 없어서 tail 만으로는 분배금이 빠짐)
+    """
+    if not os.path.exists(DIVIDENDS_PATH):
+        return {}, {}, False
+    with open(DIVIDENDS_PATH, encoding="utf-8") as f:
+        j = json.load(f)
+    divs = {dv["date"]: dv for dv in j.get("dividends") or []}
+    splits = {sp["date"]: sp for sp in j.get("splits") or []}
+    return divs, splits, bool(j.get("complete"))
+
+
+def fetch_checked(start_ts, end_ts, store=None):
+    """chunk 수신 + 겹침 검증 → (chunks, fetched, problems). store 를 주면 chunk0 과도 비교"""
+    chunks = plan_chunks(start_ts, end_ts)
+    fetched = fetch_chunks(chunks)
+    problems = []
+    for k in range(1, len(fetched)):
+        problems += check_overlap(fetched[k - 1][0], fetched[k][0], f"chunk{k - 1}/{k}")
+    if store and fetched:
+        problems += check_overlap(list(store.values()), fetched[0][0], "store/chunk0")
+    return chunks, fetched, problems
+
+
+# -------------------------
+# main
+# -------------------------
+def main():
+    ensure_dir(HISTORY_DIR)
+    t0 = time.perf_counter()
+
+    store = load_store()
+    divs, splits, events_complete = load_events()
+    now_ts = int(time.time()) + DAY
+
+    # 이벤트 목록이 상장일부터 온전할 때만 tail (아니면 tr_close 가 일부 분배금만으로 계산됨)
+    if store and events_complete and not FULL:
+        start_ts = unix_from_iso(max(store)) - OVERLAP_DAYS * DAY
+        chunks, fetched, problems = fetch_checked(start_ts, now_ts, store)
+        mode = "tail"
+        # Yahoo 종가는 분할 후 과거까지 소급 조정 → tail 구간에 분할이 있으면 불일치가 정상, 전체 재수신
+        if problems and any(slist for _, _, slist in fetched):
+            print(f"[WARN] store/chunk mismatch after a split, rebuilding from inception ({len(problems)} dates)")
+            store = {}
+            mode = "full"
+    else:
+        mode = "full"
+
+    if mode == "full":
+        # 상장일부터 다시 받으면 이벤트도 Yahoo 응답으로 교체 (분할 후 분배금 금액도 소급 조정됨)
+        divs, splits = {}, {}
+        start_ts = resolve_inception()
+        chunks, fetched, problems = fetch_checked(start_ts, now_ts)
+
+    if problems:
+        raise RuntimeError("overlap mismatch:\n  " + "\n  ".join(problems[:20]))
+
+    # 날짜순 한 번의 merge: 같은 날짜면 뒤 source(최신 fetch) 우선
+    sources = [list(store.values())] + [rows for rows, _, _ in fetched]
+    merged = {}
+    stream = heapq.merge(*[[(r["date"], i, r) for r in src] for i, src in enumerate(sources)])
+    for d, _, r in stream:
+        merged[d] = dict(r)
+
+    # 분배금/분할도 날짜 기준 병합
+    for _, dlist, slist in fetched:
+        for dv in dlist:
+            divs[dv["date"]] = dv
+        for sp in slist:
+            splits[sp["date"]] = sp
+
+    add_adjusted(merged, [divs[d] for d in sorted(divs)], [splits[d] for d in sorted(splits)])
+
+    written = 0
+    for d, row in merged.items():
+        if store.get(d) == row:
+            continue
+        with open(os.path.join(HISTORY_DIR, f"{d}.json"), "w", encoding="utf-8") as f:
+            json.dump(row, f, ensure_ascii=False, indent=2)
+        written += 1
+
+    ensure_dir(os.path.dirname(DIVIDENDS_PATH) or ".")
+    with open(DIVIDENDS_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "ticker": TICKER,
+            "dividends": [divs[d] for d in sorted(divs)],
+            "splits": [splits[d] for d in sorted(splits)],
+            "complete": True,
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ backfill {TICKER} ({mode}): chunks={len(chunks)}, rows={len(merged)}, "
+          f"written={written}, divs={len(divs)} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print("[ERR]", str(e))
+        sys.exit(1)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+backtest_tone.py
+- assets/app.js 의 computeTone 점수 규칙을 numpy 로 옮겨서 전 구간 일별 tone 계산
+  (pos52 = 52주 고저 대비 위치, 거래량 = 직전 20일 평균 대비 %, 당일 등락률)
+- tone 클래스(safe / neutral / risk)별 이후 21·63거래일 총수익(분배금 재투자) 분포와 적중률
+- walk-forward DCA 백테스트: 매월 첫 거래일 1단위 적립
+    · plain : 매월 1단위 매수
+    · signal: risk → 매수 보류(현금 적립) / 해제 달 → 모아둔 현금까지 전부 매수 / 그 외 → 이번 달 1단위만
+      해제 달은 TONE_RELEASE 로 선택: non_risk(기본, safe·neutral) / safe(safe 만)
+      점수 규칙상 도달 불가능한 클래스가 해제 조건이면 signal 은 현금 보유 효과만 재므로
+      비교 대신 degenerate 메모를 출력
+  모든 시작 월을 (시작월 × 개월) 2D 배열로 한 번에 계산 (시작일 루프 없음)
+
+출력:
+- data/tone_backtest.json
+"""
+
+import os
+import json
+
+import numpy as np
+
+from fetch_jepq import iso_from_unix, utc_now, ensure_dir
+import stats_np
+
+IN_PATH = os.environ.get("IN_PATH", "data/jepq.json")
+OUT_FILE = "data/tone_backtest.json"
+
+FWD_DAYS = (21, 63)
+DCA_MONTHS = (12, 24, 36)
+PCTS = [10, 25, 50, 75, 90]
+CLASSES = ["safe", "neutral", "risk"]
+RELEASE_RULES = {"non_risk": 1, "safe": 0}   # 이름 → 현금 해제가 되는 최대 클래스 번호
+TONE_RELEASE = os.environ.get("TONE_RELEASE", "non_risk")
+
+# computeTone (assets/app.js) 와 같은 값 — 규칙 바꾸면 양쪽 같이 수정
+TONE_BASE = 50
+POS52_HIGH, POS52_HIGH_PTS = 85, 14
+POS52_LOW, POS52_LOW_PTS = 30, -10
+VOL_SURGE, VOL_SURGE_PTS = 30, 12
+VOL_UP, VOL_UP_PTS = 10, 6
+DAY_DOWN, DAY_DOWN_PTS = -2, 8
+DAY_UP, DAY_UP_PTS = 2, -4
+SAFE_MAX, NEUTRAL_MAX = 30, 60
+
+
+def tone_score(pos52, vol_pct, day_chg):
+    """computeTone 점수 (NaN 입력은 JS 의 null 처럼 해당 규칙 건너뜀)"""
+    score = np.full(len(pos52), float(TONE_BASE))
+    with np.errstate(invalid="ignore"):
+        score += np.where(pos52 >= POS52_HIGH, POS52_HIGH_PTS, np.where(pos52 <= POS52_LOW, POS52_LOW_PTS, 0))
+        score += np.where(vol_pct >= VOL_SURGE, VOL_SURGE_PTS, np.where(vol_pct >= VOL_UP, VOL_UP_PTS, 0))
+        score += np.where(day_chg <= DAY_DOWN, DAY_DOWN_PTS, np.where(day_chg >= DAY_UP, DAY_UP_PTS, 0))
+    return np.clip(score, 0, 100)
+
+
+def score_range():
+    """규칙 조합으로 나올 수 있는 (최저, 최고) 점수"""
+    parts = [(POS52_HIGH_PTS, POS52_LOW_PTS, 0), (VOL_SURGE_PTS, VOL_UP_PTS, 0), (DAY_DOWN_PTS, DAY_UP_PTS, 0)]
+    lo = TONE_BASE + sum(min(p) for p in parts)
+    hi = TONE_BASE + sum(max(p) for p in parts)
+    return max(lo, 0), min(hi, 100)
+
+
+def reachable_classes():
+    lo, hi = score_range()
+    bounds = [(0, SAFE_MAX), (SAFE_MAX + 1e-9, NEUTRAL_MAX), (NEUTRAL_MAX + 1e-9, 100)]
+    return [name for name, (a, b) in zip(CLASSES, bounds) if a <= hi and lo <= b]
+
+
+def tone_class(score):
+    """0=safe, 1=neutral, 2=risk"""
+    return np.where(score <= SAFE_MAX, 0, np.where(score <= NEUTRAL_MAX, 1, 2))
+
+
+def tone_inputs(series):
+    highs = np.array([r["high"] for r in series], dtype=np.float64)
+    lows = np.array([r["low"] for r in series], dtype=np.float64)
+    closes = np.array([r["close"] for r in series], dtype=np.float64)
+    vols = np.array([r.get("volume") or 0 for r in series], dtype=np.float64)
+    n = len(closes)
+
+    # 대시보드 pos52 는 Yahoo meta 52주 고저(오늘 포함) 기준 → 252일 고가/저가 (끝 정렬)
+    hi = np.full(n, np.nan)
+    lo = np.full(n, np.nan)
+    if n >= 252:
+        hi[251:] = stats_np.rolling_max(highs, 252)
+        lo[251:] = stats_np.rolling_min(lows, 252)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pos52 = np.where(hi > lo, (closes - lo) / (hi - lo) * 100.0, np.nan)
+
+    # 거래량: 직전 20일(오늘 제외) 평균 대비
+    avg_prev = np.full(n, np.nan)
+    avg_prev[1:] = stats_np.rolling_sum(vols, 20)[:-1] / 20
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vol_pct = np.where(avg_prev > 0, (vols / avg_prev - 1.0) * 100.0, np.nan)
+
+    day_chg = np.full(n, np.nan)
+    day_chg[1:] = (closes[1:] / closes[:-1] - 1.0) * 100.0
+    return pos52, vol_pct, day_chg
+
+
+def total_return_index(series, dividends):
+    """분배금 재투자 지수: ex-date 에 (close + 분배금) / 전일 close"""
+    closes = np.array([r["close"] for r in series], dtype=np.float64)
+    times = np.array([r["time"] for r in series], dtype=np.int64)
+    div = np.zeros(len(closes))
+    if dividends:
+        k = np.searchsorted(times, [d["time"] for d in dividends], side="left")
+        amt = np.array([d["amount"] for d in dividends], dtype=np.float64)
+        ok = (k > 0) & (k < len(closes))
+        np.add.at(div, k[ok], amt[ok])
+    gross = np.ones(len(closes))
+    gross[1:] = (closes[1:] + div[1:]) / closes[:-1]
+    return closes[0] * np.cumprod(gross)
+
+
+def _dist(x):
+    x = x[np.isfinite(x)]
+    if not len(x):
+        return {"n": 0}
+    q = np.percentile(x, PCTS)
+    out = {"n": int(len(x)), "mean": round(float(x.mean()), 2)}
+    out.update({f"p{p}": round(float(v), 2) for p, v in zip(PCTS, q)})
+    return out
+
+
+# -------------------------
+# signal forward returns
+# -------------------------
+def class_forward_stats(cls, tr, valid):
+    out = {}
+    n = len(tr)
+    for ci, name in enumerate(CLASSES):
+        m = valid & (cls == ci)
+        row = {"days": int(m.sum())}
+        for h in FWD_DAYS:
+            fwd = np.full(n, np.nan)
+            fwd[: n - h] = (tr[h:] / tr[: n - h] - 1.0) * 100.0
+            x = fwd[m]
+            x = x[np.isfinite(x)]
+            d = _dist(x)
+            if len(x):
+                d["win_rate_pct"] = round(float((x > 0).mean() * 100.0), 1)
+                # safe 는 상승, risk 는 하락을 맞춰야 적중 / neutral 은 방향 없음
+                if name == "safe":
+                    d["hit_rate_pct"] = d["win_rate_pct"]
+                elif name == "risk":
+                    d["hit_rate_pct"] = round(float((x < 0).mean() * 100.0), 1)
+            row[f"fwd_{h}d_tr_pct"] = d
+        out[name] = row
+    return out
+
+
+# -------------------------
+# walk-forward DCA (all starts at once)
+# -------------------------
+def month_starts(series):
+    """각 월의 첫 거래일 index"""
+    ym = np.array([iso_from_unix(r["time"])[:7] for r in series])
+    first = np.ones(len(ym), dtype=bool)
+    first[1:] = ym[1:] != ym[:-1]
+    return np.flatnonzero(first)
+
+
+def dca_backtest(cls, tr, months_idx, H, release_max=RELEASE_RULES["non_risk"]):
+    """
+    months_idx: 월 첫 거래일 index, H: 적립 개월 수
+    release_max: 클래스 번호가 이 값 이하인 달에 모아둔 현금 전부 투입
+    return: dict(plain_ret, signal_ret, deployed_pct, release_months) — 각 (S,) 시작월별
+    """
+    M = len(months_idx)
+    S = M - H  # 마지막 매수 이후 평가할 한 달이 필요
+    if S <= 0:
+        return None
+
+    grid = np.arange(S)[:, None] + np.arange(H)          # (S, H) 월 번호
+    day = months_idx[grid]                               # (S, H) 매수일 index
+    end_day = months_idx[np.arange(S) + H]               # 평가일 = 다음 월 첫 거래일
+    px = tr[day]
+    end_px = tr[end_day][:, None]
+    c = cls[day]
+
+    # plain: 매월 1단위
+    plain_val = (end_px / px).sum(axis=1)
+    plain_ret = (plain_val / H - 1.0) * 100.0
+
+    # signal: risk 달 수를 누적, 마지막 해제 달 이후 쌓인 만큼이 대기 현금
+    risk = (c == 2).astype(np.float64)
+    release = c <= release_max
+    cum_risk = np.cumsum(risk, axis=1)
+    pos = np.broadcast_to(np.arange(H), (S, H))
+    last_rel = np.maximum.accumulate(np.where(release, pos, -1), axis=1)
+    at_last = np.where(last_rel >= 0, np.take_along_axis(cum_risk, np.maximum(last_rel, 0), axis=1), 0.0)
+    reserve = cum_risk - at_last                          # 각 달 처리 후 대기 현금
+    reserve_before = np.concatenate([np.zeros((S, 1)), reserve[:, :-1]], axis=1)
+    invest = np.where(release, 1.0 + reserve_before, np.where(c == 2, 0.0, 1.0))
+
+    sig_val = (invest * end_px / px).sum(axis=1) + reserve[:, -1]
+    sig_ret = (sig_val / H - 1.0) * 100.0
+    deployed = invest.sum(axis=1) / H * 100.0
+    return {"plain_ret": plain_ret, "signal_ret": sig_ret, "deployed_pct": deployed,
+            "release_months": release.sum(axis=1), "starts": day[:, 0]}
+
+
+def main():
+    with open(IN_PATH, encoding="utf-8") as f:
+        payload = json.load(f)
+    series = payload.get("series") or []
+    if len(series) < 252 + max(FWD_DAYS):
+        raise RuntimeError(f"not enough history in {IN_PATH} (rows={len(series)})")
+
+    pos52, vol_pct, day_chg = tone_inputs(series)
+    score = tone_score(pos52, vol_pct, day_chg)
+    cls = tone_class(score)
+    valid = np.isfinite(pos52)  # 52주 창이 찬 뒤부터 평가
+    tr = total_return_index(series, payload.get("dividends") or [])
+
+    if TONE_RELEASE not in RELEASE_RULES:
+        raise RuntimeError(f"unknown TONE_RELEASE={TONE_RELEASE} (use {', '.join(RELEASE_RULES)})")
+    release_max = RELEASE_RULES[TONE_RELEASE]
+    reachable = reachable_classes()
+    release_reachable = any(CLASSES.index(c) <= release_max for c in reachable)
+
+    out = {
+        "updated_utc": utc_now(),
+        "asof": iso_from_unix(series[-1]["time"]),
+        "rules": "assets/app.js computeTone",
+        "latest": {"score": float(score[-1]), "tone": CLASSES[int(cls[-1])]},
+        "score_range": list(score_range()),
+        "reachable_classes": reachable,
+        "release_rule": TONE_RELEASE,
+        "class_share_pct": {name: round(float((cls[valid] == i).mean() * 100.0), 1) for i, name in enumerate(CLASSES)},
+        "signal_forward": class_forward_stats(cls, tr, valid),
+        "dca": {},
+    }
+
+    # 52주 창이 찬 이후 월만 시작월로
+    months_idx = month_starts(series)
+    months_idx = months_idx[valid[months_idx]]
+    for H in DCA_MONTHS:
+        res = dca_backtest(cls, tr, months_idx, H, release_max)
+        if res is None:
+            out["dca"][f"{H}m"] = {"starts": 0, "note": "not enough history"}
+            continue
+        diff = res["signal_ret"] - res["plain_ret"]
+        row = {
+            "starts": int(len(diff)),
+            "first_start": iso_from_unix(series[int(res["starts"][0])]["time"]),
+            "last_start": iso_from_unix(series[int(res["starts"][-1])]["time"]),
+            "plain_ret_pct": _dist(res["plain_ret"]),
+            "signal_ret_pct": _dist(res["signal_ret"]),
+            "avg_deployed_pct": round(float(res["deployed_pct"].mean()), 1),
+            "avg_release_months": round(float(res["release_months"].mean()), 2),
+        }
+        # 해제 달이 (규칙상 또는 이 구간에서) 한 번도 없으면 보류 현금이 끝까지 안 들어가서
+        # signal - plain 은 현금 보유 효과만 남음 → 비교 대신 메모
+        if not release_reachable or not res["release_months"].any():
+            row["degenerate"] = (f"release class ({TONE_RELEASE}) never occurs "
+                                 f"(reachable={','.join(reachable)}); signal vs plain would only measure cash drag")
+        else:
+            row["signal_minus_plain_pct"] = _dist(diff)
+            row["signal_beats_plain_pct"] = round(float((diff > 0).mean() * 100.0), 1)
+        out["dca"][f"{H}m"] = row
+
+    ensure_dir(os.path.dirname(OUT_FILE) or ".")
+    with open(OUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ wrote {OUT_FILE} (tone={out['latest']['tone']}, dca={','.join(out['dca'])})")
+
+
+if __name__ == "__main__":
+    main()
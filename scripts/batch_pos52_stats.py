@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_pos52_stats.py
+- 여러 종목의 pos52 / 3개월 forward 수익률 / 배당 통계를 한 번에 계산
+- 로컬 payload 가 있는 종목은 워커가 파일 경로만 받아서 JSON 파싱 + 배열 변환 + 계산까지
+  (종목당 비용 대부분이 파싱이라 이 부분이 코어 수만큼 병렬)
+- 로컬 payload 가 없는 종목은 부모가 스레드로 받아서(네트워크 I/O, FETCH_WORKERS 상한)
+  close/배당 배열을 multiprocessing.shared_memory 블록에 올려두고
+  워커는 블록 이름만 받아서 붙는다 (시리즈 pickling 없음)
+  → 이 경로는 네트워크가 병목이라 워커 수로는 빨라지지 않음
+- 결과: 종목별 JSON + 통합 summary 1개
+- 종목 하나의 로드/계산 실패는 summary 의 failed 에만 기록하고 나머지는 계속
+- BENCH_TICKERS=200 이면 합성 payload 파일로 워커 1개 vs N개 (파싱+계산) 시간을 재서
+  data/batch/bench.json 에 기록 (BENCH_WORKERS 로 N 지정, 기본 max(2, CPU 수))
+
+입력:
+- TICKERS="JEPQ,JEPI,QQQ" 또는 TICKERS_FILE(한 줄에 한 종목)
+- SOURCE_DIR/{ticker}.json (fetch_jepq.py 출력 형식) 이 있으면 그걸 쓰고,
+  없으면 fetch_jepq.fetch_price_daily 로 받아옴
+
+출력:
+- data/batch/{TICKER}.json
+- data/batch/summary.json
+- data/batch/bench.json  (BENCH_TICKERS 모드)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from fetch_jepq import fetch_price_daily, iso_from_unix, utc_now, ensure_dir, pos52_bucket_key
+import stats_np
+
+TICKERS = os.environ.get("TICKERS", "JEPQ,JEPI,QQQ")
+TICKERS_FILE = os.environ.get("TICKERS_FILE", "")
+SOURCE_DIR = os.environ.get("SOURCE_DIR", "data")
+OUT_DIR = os.environ.get("BATCH_OUT_DIR", "data/batch")
+WORKERS = int(os.environ.get("WORKERS", "0")) or (os.cpu_count() or 1)
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", "8"))
+PRICE_FIELD = os.environ.get("PRICE_FIELD", "close")  # close / adj_close / tr_close
+BENCH_TICKERS = int(os.environ.get("BENCH_TICKERS", "0"))
+BENCH_WORKERS = int(os.environ.get("BENCH_WORKERS", "0")) or max(2, os.cpu_count() or 1)
+BENCH_ROWS = 1260   # 합성 시리즈 길이 (약 5년)
+
+LOOKBACK = 252
+HORIZON = 63
+YEAR_SEC = 365 * 24 * 60 * 60
+
+
+def load_tickers():
+    if TICKERS_FILE:
+        with open(TICKERS_FILE, encoding="utf-8") as f:
+            names = [ln.strip() for ln in f]
+    else:
+        names = TICKERS.split(",")
+    # 순서 유지 중복 제거
+    return list(dict.fromkeys(t.strip().upper() for t in names if t.strip() and not t.startswith("#")))
+
+
+def source_path(ticker):
+    return os.path.join(SOURCE_DIR, f"{ticker.lower()}.json")
+
+
+def load_file(path):
+    """(series, dividends) — fetch_jepq.py 출력 형식 payload"""
+    with open(path, encoding="utf-8") as f:
+        j = json.load(f)
+    return j.get("series") or [], j.get("dividends") or []
+
+
+# -------------------------
+# shared memory
+# -------------------------
+def _put_shared(arr):
+    """2D float64 배열을 새 shared memory 블록에 복사 (빈 배열도 최소 8 bytes 확보)"""
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 8))
+    view = np.ndarray(arr.shape, dtype=np.float64, buffer=shm.buf)
+    view[:] = arr
+    del view
+    return shm
+
+
+def _attach(name):
+    # 3.13+ 는 track=False 로 워커 쪽 resource_tracker 등록을 막는다 (해제는 부모 담당)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def to_blocks(series, dividends):
+    # 행: time / close(배당 통계용) / PRICE_FIELD(pos52 통계용)
+    px = np.array([[float(r["time"]), float(r["close"]), float(r.get(PRICE_FIELD, r["close"]))] for r in series],
+                  dtype=np.float64).reshape(-1, 3).T
+    dv = np.array([[float(d["time"]), float(d["amount"])] for d in dividends], dtype=np.float64).reshape(-1, 2).T
+    return px, dv
+
+
+# -------------------------
+# worker
+# -------------------------
+def dividend_stats(times, closes, div_t, div_amt):
+    out = {
+        "count": int(len(div_amt)),
+        "last_dividend": None,
+        "last_dividend_date": None,
+        "ttm_dividend": None,
+        "ttm_yield_pct": None,
+        "monthly_avg_dividend": None,
+        "avg_yield_per_dist_pct": None,
+    }
+    if not len(div_amt) or not len(closes):
+        return out
+
+    out["last_dividend"] = float(div_amt[-1])
+    out["last_dividend_date"] = iso_from_unix(int(div_t[-1]))
+
+    ttm = float(div_amt[div_t >= times[-1] - YEAR_SEC].sum())
+    out["ttm_dividend"] = round(ttm, 4)
+    out["monthly_avg_dividend"] = round(ttm / 12.0, 4) if ttm else None
+    out["ttm_yield_pct"] = round(ttm / closes[-1] * 100.0, 2) if closes[-1] else None
+
+    # 배당락일 직전 종가 대비 분배율
+    k = np.searchsorted(times, div_t, side="left") - 1
+    ok = k >= 0
+    if ok.any():
+        prev_close = closes[k[ok]]
+        out["avg_yield_per_dist_pct"] = round(float(np.mean(div_amt[ok] / prev_close) * 100.0), 3)
+    return out
+
+
+def analyze_arrays(ticker, px, dv):
+    """px: (3, n) time/close/PRICE_FIELD, dv: (2, m) time/amount → 종목 결과 dict"""
+    n = px.shape[1]
+    times, closes, prices = px[0], px[1], px[2]
+
+    out = {
+        "ticker": ticker,
+        "asof": iso_from_unix(int(times[-1])) if n else None,
+        "rows": n,
+        "field": PRICE_FIELD,
+        "current": {"pos_52w_pct": None, "pos52_bucket": None},
+    }
+
+    if n < LOOKBACK + HORIZON + 5:
+        out["pos52_bucket_stats"] = {
+            "asof": out["asof"], "lookback": LOOKBACK, "horizon": HORIZON,
+            "buckets": {}, "note": "not enough history",
+        }
+    else:
+        idx, pos, ret, dd = stats_np.pos52_rows(prices, LOOKBACK, HORIZON)
+        out["pos52_bucket_stats"] = {
+            "asof": out["asof"], "lookback": LOOKBACK, "horizon": HORIZON,
+            "buckets": stats_np.bucket_stats(pos, ret, dd),
+        }
+
+    # 현재 pos52 (시리즈 기반: 마지막 close vs 직전 252일)
+    if n > LOOKBACK:
+        cur = stats_np.pos52_array(prices[-(LOOKBACK + 1):], LOOKBACK)[-1]
+        if np.isfinite(cur):
+            out["current"]["pos_52w_pct"] = round(float(cur), 2)
+            out["current"]["pos52_bucket"] = pos52_bucket_key(cur)
+
+    out["dividend_summary"] = dividend_stats(times, closes, dv[0], dv[1])
+    return out
+
+
+def analyze_block(task):
+    """("shm", ticker, px_name, n, dv_name, m) — 부모가 올려둔 shared memory 에 붙어서 계산"""
+    _, ticker, px_name, n, dv_name, m = task
+    px_shm, dv_shm = _attach(px_name), _attach(dv_name)
+    try:
+        px = np.ndarray((3, n), dtype=np.float64, buffer=px_shm.buf)
+        dv = np.ndarray((2, m), dtype=np.float64, buffer=dv_shm.buf)
+        out = analyze_arrays(ticker, px, dv)
+        # numpy view가 남아 있으면 close()에서 BufferError
+        del px, dv
+        return out
+    finally:
+        px_shm.close()
+        dv_shm.close()
+
+
+def analyze_file(task):
+    """("file", ticker, path) — 워커에서 payload 파싱부터"""
+    _, ticker, path = task
+    px, dv = to_blocks(*load_file(path))
+    return analyze_arrays(ticker, px, dv)
+
+
+def _safe_analyze(task):
+    # 워커 안 예외(깨진 payload 포함)도 종목 단위로 잡아서 배치 전체가 멈추지 않도록
+    try:
+        fn = analyze_file if task[0] == "file" else analyze_block
+        return task[1], fn(task), None
+    except Exception as e:
+        return task[1], None, f"{type(e).__name__}: {e}"
+
+
+def share_blocks(loaded):
+    """loaded → (shared memory 블록들, 워커 task 들, 로드 실패 {ticker: err})"""
+    blocks, tasks, failed = [], [], {}
+    try:
+        for ticker, series, dividends, err in loaded:
+            if err:
+                failed[ticker] = err
+                continue
+            # 행 하나가 깨진 payload(close null, time 누락 등)도 그 종목만 실패 처리
+            try:
+                px, dv = to_blocks(series, dividends)
+            except Exception as e:
+                failed[ticker] = f"bad payload: {type(e).__name__}: {e}"
+                continue
+            px_shm, dv_shm = _put_shared(px), _put_shared(dv)
+            blocks += [px_shm, dv_shm]
+            tasks.append(("shm", ticker, px_shm.name, px.shape[1], dv_shm.name, dv.shape[1]))
+    except Exception:
+        # 중간에 실패하면 이미 만든 블록은 여기서 정리
+        release_blocks(blocks)
+        raise
+    return blocks, tasks, failed
+
+
+def release_blocks(blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+def run_tasks(tasks, workers):
+    """[(ticker, out, err), ...] — workers 1 이면 프로세스 풀 없이 현재 프로세스에서"""
+    if workers <= 1:
+        return [_safe_analyze(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_safe_analyze, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+
+# -------------------------
+# bench
+# -------------------------
+def write_synthetic(out_dir, n_tickers, rows=BENCH_ROWS, seed=0):
+    """로그정규 랜덤워크 OHLCV + 월 분배금 payload 파일 (fetch_jepq.py 출력 형식) → file task 들"""
+    rng = np.random.default_rng(seed)
+    t0 = 1_500_000_000
+    times = t0 + np.arange(rows) * 86400
+    tasks = []
+    for i in range(n_tickers):
+        closes = 50.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, rows)))
+        series = [{"time": int(t), "open": float(c), "high": float(c) * 1.005, "low": float(c) * 0.995,
+                   "close": float(c), "volume": 1_000_000} for t, c in zip(times, closes)]
+        dividends = [{"time": int(times[k]), "date": iso_from_unix(int(times[k])),
+                      "amount": round(float(closes[k - 1]) * 0.008, 4)} for k in range(21, rows, 21)]
+        ticker = f"SYN{i:04d}"
+        path = os.path.join(out_dir, f"{ticker.lower()}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"ticker": ticker, "series": series, "dividends": dividends}, f)
+        tasks.append(("file", ticker, path))
+    return tasks
+
+
+def bench():
+    ensure_dir(OUT_DIR)
+    timing = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks = write_synthetic(tmp, BENCH_TICKERS)
+        for w in (1, BENCH_WORKERS):
+            t0 = time.perf_counter()
+            res = run_tasks(tasks, w)
+            timing[w] = time.perf_counter() - t0
+            bad = [t for t, _, err in res if err]
+            if bad:
+                raise RuntimeError(f"bench failures with workers={w}: {bad[:5]}")
+
+    out = {
+        "updated_utc": utc_now(),
+        "tickers": BENCH_TICKERS,
+        "rows_per_ticker": BENCH_ROWS,
+        "cpu_count": os.cpu_count(),
+        "parse_compute_sec": {str(w): round(t, 3) for w, t in timing.items()},
+        "speedup": round(timing[1] / timing[BENCH_WORKERS], 2) if timing[BENCH_WORKERS] else None,
+    }
+    path = os.path.join(OUT_DIR, "bench.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+    print(f"[OK] bench {BENCH_TICKERS} tickers: " +
+          ", ".join(f"workers={w} {t:.2f}s" for w, t in timing.items()) +
+          f" (cpu={os.cpu_count()}) -> {path}")
+
+
+# -------------------------
+# main
+# -------------------------
+def main():
+    tickers = load_tickers()
+    if not tickers:
+        raise RuntimeError("No tickers (set TICKERS or TICKERS_FILE).")
+    ensure_dir(OUT_DIR)
+
+    # 로컬 payload 는 워커가 직접 파싱, 나머지만 부모가 네트워크로 받아서 shared memory 로
+    local = [t for t in tickers if os.path.exists(source_path(t))]
+    remote = [t for t in tickers if t not in set(local)]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+        loaded = list(ex.map(lambda t: (t, *_safe_fetch(t)), remote))
+    t_load = time.perf_counter() - t0
+
+    blocks, shm_tasks, failed = share_blocks(loaded)
+    by_ticker = {t[1]: t for t in shm_tasks}
+    by_ticker.update({t: ("file", t, source_path(t)) for t in local})
+    tasks = [by_ticker[t] for t in tickers if t in by_ticker]
+    try:
+        t1 = time.perf_counter()
+        done = run_tasks(tasks, WORKERS)
+        t_calc = time.perf_counter() - t1
+    finally:
+        release_blocks(blocks)
+
+    results = []
+    for ticker, out, err in done:
+        if err:
+            failed[ticker] = err
+        else:
+            results.append(out)
+
+    summary_rows = []
+    for r in results:
+        with open(os.path.join(OUT_DIR, f"{r['ticker']}.json"), "w", encoding="utf-8") as f:
+            json.dump(r, f, ensure_ascii=False, indent=2)
+
+        cur_bucket = r["current"]["pos52_bucket"]
+        bstat = (r["pos52_bucket_stats"].get("buckets") or {}).get(cur_bucket) or {}
+        summary_rows.append({
+            "ticker": r["ticker"],
+            "asof": r["asof"],
+            "rows": r["rows"],
+            "pos_52w_pct": r["current"]["pos_52w_pct"],
+            "pos52_bucket": cur_bucket,
+            "bucket_sample_size": bstat.get("sample_size"),
+            "bucket_avg_ret_3m": bstat.get("avg_ret_3m"),
+            "bucket_worst_max_dd": bstat.get("worst_max_dd"),
+            "ttm_yield_pct": r["dividend_summary"]["ttm_yield_pct"],
+        })
+
+    summary = {
+        "updated_utc": utc_now(),
+        "lookback": LOOKBACK,
+        "horizon": HORIZON,
+        "workers": WORKERS,
+        "timing_sec": {"fetch": round(t_load, 3), "parse_compute": round(t_calc, 3)},
+        "tickers": summary_rows,
+        "failed": failed,
+    }
+    with open(os.path.join(OUT_DIR, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"[OK] batch pos52 stats: {len(results)} tickers, {len(failed)} failed "
+          f"(fetch {t_load:.2f}s, parse+compute {t_calc:.2f}s, workers={WORKERS}) -> {OUT_DIR}")
+
+
+def _safe_fetch(ticker):
+    # 한 종목 실패가 전체 배치를 멈추지 않도록
+    try:
+        series, _, _, dividends, _ = fetch_price_daily(ticker)
+        return series, dividends, None
+    except Exception as e:
+        return [], [], str(e)
+
+
+if __name__ == "__main__":
+    try:
+        bench() if BENCH_TICKERS else main()
+    except Exception as e:
+        print("[ERR]", str(e))
+        sys.exit(1)
@@ -1,9 +1,15 @@
 import subprocess
 
 cmds = [
-    "python scripts/fetch_history.py",
+    "python scripts/backfill_history.py",
+    "python scripts/fetch_jepq.py",
+    "python scripts/compute_cross_ticker.py",
     "python scripts/compute_pos52_bucket_stats.py",
-    "python scripts/compute_event_avg_move.py"
+    "python scripts/compute_conditional_stats.py",
+    "python scripts/compute_event_avg_move.py",
+    "python scripts/compute_event_study.py",
+    "python scripts/simulate_income.py",
+    "python scripts/backtest_tone.py"
 ]
 
 for c in cmds:
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+compute_conditional_stats.py
+- pos52 단일 조건 대신 pos52 × 변동성 구간, pos52 × 200일선 이격 같은
+  다차원 조건별 3개월 forward 성과 통계
+- 행별 feature 배열은 한 번만 계산(정의별 캐시), 각 차원은 정수 bin 코드로 바꾸고
+  차원 코드를 합쳐 N차원 grid 의 cell 번호 하나로 만든 뒤
+  bincount / minimum.at / 정렬 한 번으로 cell 별 집계
+  → 차원 하나 추가 = 배열 pass 하나 (버킷마다 재스캔 X)
+
+조건 정의 (CONDITIONS):
+  {"name": ..., "dims": [{"feature": "pos52", "edges": [0, 35, 70, 90, 100.000001]},
+                         {"feature": "rv_20", "edges": "tercile"}]}
+  edges 가 "tercile"/"quartile"/"quintile" 이면 유효 구간 분위수로 자동 경계
+
+출력:
+- data/conditional_stats.json
+- data/cache/conditional_features.npz  (feature 정의 + 데이터 지문 → 배열)
+"""
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from fetch_jepq import iso_from_unix, utc_now, ensure_dir
+import stats_np
+
+IN_PATH = os.environ.get("IN_PATH", "data/jepq.json")
+OUT_FILE = "data/conditional_stats.json"
+CACHE_FILE = "data/cache/conditional_features.npz"
+
+LOOKBACK = 252
+HORIZON = 63
+QUANTILES = (0.1, 0.5, 0.9)
+
+# feature 이름 → (함수, 파라미터)
+FEATURES = {
+    "pos52":      (lambda c, p: stats_np.pos52_array(c, p["lookback"]),         {"lookback": LOOKBACK}),
+    "rv_20":      (lambda c, p: stats_np.realized_vol(c, p["w"]),               {"w": 20}),
+    "dist_ma200": (lambda c, p: (c / stats_np.moving_average(c, p["w"]) - 1.0) * 100.0, {"w": 200}),
+}
+
+POS52_EDGES = [b[1] for b in stats_np.BUCKETS_DEF] + [stats_np.BUCKETS_DEF[-1][2]]
+
+CONDITIONS = [
+    {"name": "pos52", "dims": [{"feature": "pos52", "edges": POS52_EDGES}]},
+    {"name": "pos52_x_vol", "dims": [
+        {"feature": "pos52", "edges": POS52_EDGES},
+        {"feature": "rv_20", "edges": "tercile"},
+    ]},
+    {"name": "pos52_x_ma200", "dims": [
+        {"feature": "pos52", "edges": POS52_EDGES},
+        {"feature": "dist_ma200", "edges": [-100, -5, 0, 5, 1000]},
+    ]},
+]
+
+AUTO_EDGES = {"tercile": 3, "quartile": 4, "quintile": 5}
+
+
+# -------------------------
+# features (cached by definition)
+# -------------------------
+class FeatureCache:
+    """
+    key = sha1(feature 이름 + 파라미터 + 데이터 지문)
+    같은 정의는 프로세스 안에서도, 다음 실행에서도(npz) 다시 계산하지 않음
+    """
+
+    def __init__(self, closes, fingerprint, path=CACHE_FILE):
+        self.closes = closes
+        self.fingerprint = fingerprint
+        self.path = path
+        self.arrays = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            with np.load(path) as z:
+                self.arrays = {k: z[k] for k in z.files}
+
+    def key(self, name):
+        _, params = FEATURES[name]
+        raw = json.dumps({"feature": name, "params": params, "data": self.fingerprint}, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, name):
+        k = self.key(name)
+        if k not in self.arrays:
+            fn, params = FEATURES[name]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.arrays[k] = np.asarray(fn(self.closes, params), dtype=np.float64)
+            self.dirty = True
+        return self.arrays[k]
+
+    def save(self, keep):
+        if not (self.path and self.dirty):
+            return
+        ensure_dir(os.path.dirname(self.path) or ".")
+        # 현재 지문 외 옛 배열은 버림
+        live = {self.key(n): self.arrays[self.key(n)] for n in keep if self.key(n) in self.arrays}
+        np.savez(self.path, **live)
+
+
+# -------------------------
+# grid
+# -------------------------
+def resolve_edges(values, edges):
+    if isinstance(edges, str):
+        q = AUTO_EDGES[edges]
+        v = values[np.isfinite(values)]
+        inner = np.quantile(v, np.linspace(0, 1, q + 1)[1:-1]) if len(v) else []
+        return [-np.inf] + [float(x) for x in inner] + [np.inf]
+    return [float(x) for x in edges]
+
+
+def dim_codes(values, edges):
+    """값 → bin 코드 (경계 밖/NaN 은 -1). edges[i] <= x < edges[i+1]"""
+    code = np.searchsorted(np.asarray(edges), values, side="right") - 1
+    code[~np.isfinite(values) | (code < 0) | (code >= len(edges) - 1)] = -1
+    return code
+
+
+def grid_cells(feature_arrays, edges_list):
+    """차원별 코드를 row-major 로 합쳐 cell 번호 하나로 (어느 차원이든 -1 이면 -1)"""
+    n = len(feature_arrays[0])
+    cell = np.zeros(n, dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    shape = []
+    for vals, edges in zip(feature_arrays, edges_list):
+        nb = len(edges) - 1
+        c = dim_codes(vals, edges)
+        valid &= c >= 0
+        cell = cell * nb + np.maximum(c, 0)
+        shape.append(nb)
+    cell[~valid] = -1
+    return cell, shape
+
+
+def grouped_stats(cell, n_cells, ret, dd):
+    """cell 번호 기준 한 번에 집계 (bincount / minimum.at / lexsort 분위수)"""
+    m = cell >= 0
+    cell, ret, dd = cell[m], ret[m], dd[m]
+
+    cnt = np.bincount(cell, minlength=n_cells)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_ret = np.bincount(cell, weights=ret, minlength=n_cells) / cnt
+        mean_dd = np.bincount(cell, weights=dd, minlength=n_cells) / cnt
+        win = np.bincount(cell, weights=(ret > 0).astype(np.float64), minlength=n_cells) / cnt * 100.0
+    min_ret = np.full(n_cells, np.inf)
+    np.minimum.at(min_ret, cell, ret)
+    worst_dd = np.full(n_cells, np.inf)
+    np.minimum.at(worst_dd, cell, dd)
+
+    # 분위수: (cell, ret) 정렬 후 그룹 시작 위치 + 선형보간
+    order = np.lexsort((ret, cell))
+    sorted_ret = ret[order]
+    start = np.concatenate(([0], np.cumsum(cnt)[:-1]))
+    qs = {}
+    for q in QUANTILES:
+        pos = start + q * np.maximum(cnt - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, start + np.maximum(cnt - 1, 0))
+        frac = pos - lo
+        has = cnt > 0
+        v = np.full(n_cells, np.nan)
+        v[has] = sorted_ret[lo[has]] * (1 - frac[has]) + sorted_ret[hi[has]] * frac[has]
+        qs[q] = v
+
+    return {
+        "count": cnt, "mean_ret": mean_ret, "min_ret": min_ret, "win_rate": win,
+        "mean_dd": mean_dd, "worst_dd": worst_dd, "quantiles": qs,
+    }
+
+
+def _r(x, nd=2):
+    return round(float(x), nd) if np.isfinite(x) else None
+
+
+def _label(edges, i):
+    a, b = edges[i], edges[i + 1]
+    fa = "-inf" if a == -np.inf else f"{a:g}"
+    fb = "inf" if b == np.inf else f"{b:g}"
+    return f"[{fa},{fb})"
+
+
+def run_condition(cond, fc, ret, dd, ok):
+    feats = [fc.get(d["feature"]) for d in cond["dims"]]
+    edges_list = [resolve_edges(f[ok], d["edges"]) for f, d in zip(feats, cond["dims"])]
+
+    cell, shape = grid_cells([f[ok] for f in feats], edges_list)
+    n_cells = int(np.prod(shape))
+    st = grouped_stats(cell, n_cells, ret[ok], dd[ok])
+
+    cells = []
+    for c in np.flatnonzero(st["count"]):
+        idx = np.unravel_index(c, shape)
+        row = {
+            "index": [int(i) for i in idx],
+            "key": " | ".join(f"{d['feature']}{_label(e, i)}" for d, e, i in zip(cond["dims"], edges_list, idx)),
+            "sample_size": int(st["count"][c]),
+            "avg_ret_3m_pct": _r(st["mean_ret"][c]),
+            "min_ret_3m_pct": _r(st["min_ret"][c]),
+            "win_rate_3m_pct": _r(st["win_rate"][c], 1),
+            "avg_max_dd_pct": _r(st["mean_dd"][c]),
+            "worst_max_dd_pct": _r(st["worst_dd"][c]),
+        }
+        for q, v in st["quantiles"].items():
+            row[f"p{int(q * 100)}_ret_3m_pct"] = _r(v[c])
+        cells.append(row)
+
+    # 현재(마지막 행) 가 속한 cell
+    last = [np.array([f[-1]]) for f in feats]
+    cur_cell, _ = grid_cells(last, edges_list)
+    current = None
+    if cur_cell[0] >= 0:
+        current = {
+            "index": [int(i) for i in np.unravel_index(int(cur_cell[0]), shape)],
+            "features": {d["feature"]: _r(f[-1]) for d, f in zip(cond["dims"], feats)},
+        }
+
+    return {
+        "dims": [{"feature": d["feature"], "edges": [None if not np.isfinite(x) else round(x, 4) for x in e]}
+                 for d, e in zip(cond["dims"], edges_list)],
+        "shape": shape,
+        "rows": int((cell >= 0).sum()),
+        "current": current,
+        "cells": cells,
+    }
+
+
+def main():
+    with open(IN_PATH, encoding="utf-8") as f:
+        payload = json.load(f)
+    series = payload.get("series") or []
+    if len(series) < LOOKBACK + HORIZON + 5:
+        raise RuntimeError(f"not enough history in {IN_PATH} (rows={len(series)})")
+
+    closes = np.array([r["close"] for r in series], dtype=np.float64)
+    fingerprint = [len(series), series[0]["time"], series[-1]["time"], series[-1]["close"]]
+    fc = FeatureCache(closes, fingerprint)
+
+    ret, dd = stats_np.forward_ret_dd(closes, HORIZON)
+    ok = np.isfinite(ret) & np.isfinite(dd)
+    ok[:LOOKBACK] = False
+
+    out = {
+        "updated_utc": utc_now(),
+        "asof": iso_from_unix(series[-1]["time"]),
+        "lookback": LOOKBACK,
+        "horizon": HORIZON,
+        "conditions": {c["name"]: run_condition(c, fc, ret, dd, ok) for c in CONDITIONS},
+    }
+    fc.save(keep=list(FEATURES))
+
+    ensure_dir(os.path.dirname(OUT_FILE) or ".")
+    with open(OUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ wrote {OUT_FILE} (conditions={len(CONDITIONS)}, rows={int(ok.sum())})")
+
+
+if __name__ == "__main__":
+    main()
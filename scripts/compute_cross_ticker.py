@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+compute_cross_ticker.py
+- JEPQ를 QQQ / JEPI 등 비교 종목과 "같은 거래일" 기준으로 맞춰서
+  rolling 상관계수 / 베타 / 상승·하락 capture ratio / 상대강도 pos52 계산
+- 정렬은 날짜 정렬된 시리즈끼리 sorted-merge join (교집합 거래일)
+- rolling 값은 cumsum 차분 + 블록 누적 min/max 로 전부 O(n)
+
+입력:
+- SOURCE_DIR/{ticker}.json (fetch_jepq.py 출력) 이 있으면 그 series 그대로
+- 없으면 종목별 캐시 data/cross/src/{TICKER}.json 에 시세를 쌓아두고
+  다음 실행엔 최근 1mo 만 받아서 tail 병합 (캐시가 없거나 오래됐으면 5y)
+
+출력 (컬럼형, 페어당 1파일):
+- data/cross/{BASE}_vs_{BENCH}.json
+    {"dates": [...], "columns": {"corr_63": [...], "beta_252": [...], ...}, "latest": {...}}
+- data/cross/summary.json  (페어별 latest 만 모음)
+  두 종목 시세 지문(source)이 기존 페어 파일과 같으면 다시 계산하지 않음
+"""
+
+import os
+import sys
+import json
+import time
+
+import numpy as np
+
+from fetch_jepq import fetch_chart, iso_from_unix, utc_now, ensure_dir
+import stats_np
+
+BASE_TICKER = os.environ.get("BASE_TICKER", "JEPQ").upper()
+BENCHMARKS = [t.strip().upper() for t in os.environ.get("BENCHMARKS", "QQQ,JEPI").split(",") if t.strip()]
+OUT_DIR = os.environ.get("CROSS_OUT_DIR", "data/cross")
+SOURCE_DIR = os.environ.get("SOURCE_DIR", "data")
+SRC_CACHE_DIR = os.path.join(OUT_DIR, "src")
+TAIL_RANGE = "1mo"
+TAIL_MAX_AGE_DAYS = 25   # 캐시 마지막 봉이 이보다 오래되면 tail 로는 빈 구간이 생겨서 전체 재수신
+
+WINDOWS = (63, 252)
+REL_LOOKBACK = 252
+
+
+# -------------------------
+# sources
+# -------------------------
+def load_series(ticker):
+    """시간순 [{"time", "close"}, ...] — 로컬 payload 우선, 아니면 캐시 + Yahoo tail"""
+    path = os.path.join(SOURCE_DIR, f"{ticker.lower()}.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return (json.load(f).get("series") or [])
+
+    cache_path = os.path.join(SRC_CACHE_DIR, f"{ticker}.json")
+    cached = []
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f).get("series") or []
+        except Exception:
+            cached = []
+
+    fresh = bool(cached) and cached[-1]["time"] >= time.time() - TAIL_MAX_AGE_DAYS * 24 * 60 * 60
+    _, series, _ = fetch_chart(ticker, range_=TAIL_RANGE if fresh else "5y")
+
+    # 같은 시각이면 새로 받은 값 우선
+    by_time = {r["time"]: r for r in cached} if fresh else {}
+    for r in series:
+        by_time[r["time"]] = {"time": r["time"], "close": r["close"]}
+    merged = [by_time[t] for t in sorted(by_time)]
+
+    if merged != cached:
+        ensure_dir(SRC_CACHE_DIR)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"ticker": ticker, "series": merged}, f, ensure_ascii=False, separators=(",", ":"))
+    return merged
+
+
+def source_fingerprint(series):
+    if not series:
+        return [0, None, None, None]
+    return [len(series), series[0]["time"], series[-1]["time"], series[-1]["close"]]
+
+
+# -------------------------
+# align
+# -------------------------
+def merge_align(*series_list):
+    """
+    각 시리즈(시간순 정렬) 를 날짜 키로 k-way sorted-merge 해서
+    모든 종목에 다 있는 거래일만 남김.
+    return: (dates[list[str]], closes[np.ndarray shape (k, n)])
+    """
+    keyed = [[(iso_from_unix(int(r["time"])), r["close"]) for r in s] for s in series_list]
+    k = len(keyed)
+    ptr = [0] * k
+    dates, rows = [], []
+    while all(ptr[j] < len(keyed[j]) for j in range(k)):
+        heads = [keyed[j][ptr[j]][0] for j in range(k)]
+        hi = max(heads)
+        if all(h == hi for h in heads):
+            dates.append(hi)
+            rows.append([keyed[j][ptr[j]][1] for j in range(k)])
+            for j in range(k):
+                ptr[j] += 1
+            continue
+        # 가장 늦은 날짜에 못 미치는 쪽만 전진
+        for j in range(k):
+            while ptr[j] < len(keyed[j]) and keyed[j][ptr[j]][0] < hi:
+                ptr[j] += 1
+    closes = np.array(rows, dtype=np.float64).reshape(-1, k).T
+    return dates, closes
+
+
+# -------------------------
+# rolling pair stats
+# -------------------------
+def pair_columns(a, b, windows=WINDOWS, rel_lookback=REL_LOOKBACK):
+    """
+    a, b: 같은 날짜축의 종가 배열 (a=대상, b=벤치마크)
+    return: {col_name: np.ndarray(len(a))}  (첫날/창 미충족 구간 NaN)
+    """
+    n = len(a)
+    ra = np.full(n, np.nan)
+    rb = np.full(n, np.nan)
+    ra[1:] = a[1:] / a[:-1] - 1.0
+    rb[1:] = b[1:] / b[:-1] - 1.0
+
+    # 첫날 NaN 이 cumsum 전체를 오염시키지 않도록 0 으로 두고, 창 판단은 카운트로
+    x = np.nan_to_num(ra)
+    y = np.nan_to_num(rb)
+    valid = (np.isfinite(ra) & np.isfinite(rb)).astype(np.float64)
+    up = (y > 0) & (valid > 0)
+    dn = (y < 0) & (valid > 0)
+
+    cols = {}
+    for w in windows:
+        cnt = stats_np.rolling_sum(valid, w)
+        sx, sy = stats_np.rolling_sum(x, w), stats_np.rolling_sum(y, w)
+        sxx, syy = stats_np.rolling_sum(x * x, w), stats_np.rolling_sum(y * y, w)
+        sxy = stats_np.rolling_sum(x * y, w)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (sxy - sx * sy / cnt) / (cnt - 1)
+            var_x = (sxx - sx * sx / cnt) / (cnt - 1)
+            var_y = (syy - sy * sy / cnt) / (cnt - 1)
+            corr = cov / np.sqrt(var_x * var_y)
+            beta = cov / var_y
+
+            # capture ratio = (벤치 상승일 대상 평균수익 / 벤치 상승일 평균수익) * 100
+            up_n = stats_np.rolling_sum(up, w)
+            dn_n = stats_np.rolling_sum(dn, w)
+            up_cap = (stats_np.rolling_sum(np.where(up, x, 0.0), w) /
+                      stats_np.rolling_sum(np.where(up, y, 0.0), w)) * 100.0
+            dn_cap = (stats_np.rolling_sum(np.where(dn, x, 0.0), w) /
+                      stats_np.rolling_sum(np.where(dn, y, 0.0), w)) * 100.0
+
+        short = cnt < w  # 첫 수익률 NaN 포함 창은 버림
+        for arr in (corr, beta):
+            arr[short] = np.nan
+        up_cap[short | (up_n == 0)] = np.nan
+        dn_cap[short | (dn_n == 0)] = np.nan
+
+        cols[f"corr_{w}"] = corr
+        cols[f"beta_{w}"] = beta
+        cols[f"up_capture_{w}"] = up_cap
+        cols[f"down_capture_{w}"] = dn_cap
+
+    # 상대강도(a/b) 의 52주 위치
+    rel = a / b
+    cols["rel_strength"] = rel
+    cols["rel_pos52"] = stats_np.pos52_array(rel, rel_lookback)
+    return cols
+
+
+def _col_list(arr, nd=4):
+    return [None if not np.isfinite(v) else round(float(v), nd) for v in arr]
+
+
+def build_pair(base, bench, base_series, bench_series):
+    dates, closes = merge_align(base_series, bench_series)
+    cols = pair_columns(closes[0], closes[1]) if len(dates) > 1 else {}
+    out_cols = {name: _col_list(arr) for name, arr in cols.items()}
+    latest = {name: (vals[-1] if vals else None) for name, vals in out_cols.items()}
+    return {
+        "base": base,
+        "benchmark": bench,
+        "updated_utc": utc_now(),
+        "asof": dates[-1] if dates else None,
+        "rows": len(dates),
+        "windows": list(WINDOWS),
+        "rel_lookback": REL_LOOKBACK,
+        "dates": dates,
+        "columns": out_cols,
+        "latest": latest,
+    }
+
+
+# -------------------------
+# main
+# -------------------------
+def main():
+    ensure_dir(OUT_DIR)
+    base_series = load_series(BASE_TICKER)
+
+    summary = {"updated_utc": utc_now(), "base": BASE_TICKER, "pairs": {}}
+    for bench in BENCHMARKS:
+        if bench == BASE_TICKER:
+            continue
+        bench_series = load_series(bench)
+        source = [source_fingerprint(base_series), source_fingerprint(bench_series)]
+        path = os.path.join(OUT_DIR, f"{BASE_TICKER}_vs_{bench}.json")
+
+        art = None
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    art = json.load(f)
+            except Exception:
+                art = None
+        if art and art.get("source") == source:
+            status = "unchanged"
+        else:
+            art = build_pair(BASE_TICKER, bench, base_series, bench_series)
+            art["source"] = source
+            with open(path, "w", encoding="utf-8") as f:
+                # 컬럼형 artifact 라 들여쓰기 없이 compact 저장
+                json.dump(art, f, ensure_ascii=False, separators=(",", ":"))
+            status = "updated"
+
+        summary["pairs"][bench] = {"asof": art["asof"], "rows": art["rows"], **art["latest"]}
+        print(f"[OK] {BASE_TICKER} vs {bench}: rows={art['rows']} ({status}) -> {path}")
+
+    with open(os.path.join(OUT_DIR, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print("[ERR]", str(e))
+        sys.exit(1)
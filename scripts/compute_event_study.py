@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+compute_event_study.py
+- 배당락일(ex-date) 전후 [-K, +K] 거래일 주가 반응 event study
+- 이벤트 → 거래일 index 로 매핑 후, 모든 이벤트의 window 수익률을
+  2D 배열 한 번의 인덱싱으로 잘라서 계산
+    · abnormal return = 일간수익률 - 직전 EST_DAYS 평균수익률 (constant-mean)
+    · ex-date 당일은 분배금만큼 빠지는 게 정상이라 분배금을 더한 조정 AR 도 같이
+    · gap_vs_dist = (직전 종가 - 당일 시가) / 분배금  (1이면 분배금만큼 정확히 갭하락)
+    · recovery_days = 직전 종가를 다시 회복(종가 기준)하기까지 거래일
+- 이벤트별 결과는 캐시에 저장해서, 다음 실행엔 새 이벤트(또는 window/회복 탐색창이 덜 찬 이벤트)만 계산
+- 이벤트 타입은 EVENT_TYPES 에 loader 를 등록해서 확장 (예: 옵션 만기)
+
+입력:
+- data/jepq.json (series / dividends)
+- data/events.json (옵션/선물 만기 일정)
+
+출력:
+- data/event_study.json
+- data/event_study_cache.json
+"""
+
+import os
+import json
+from datetime import date
+
+import numpy as np
+
+from fetch_jepq import iso_from_unix, utc_now, ensure_dir
+from build_events import third_friday, add_months
+
+IN_PATH = os.environ.get("IN_PATH", "data/jepq.json")
+EVENTS_FILE = "data/events.json"
+OUT_FILE = "data/event_study.json"
+CACHE_FILE = "data/event_study_cache.json"
+
+K = 5              # window: [-K, +K] 거래일
+EST_DAYS = 60      # 정상수익률 추정 구간 (window 직전)
+RECOVERY_MAX = 63  # 회복일 탐색 상한 (거래일)
+CACHE_VERSION = 2  # 캐시 항목 의미가 바뀌면 올림 (2: complete 에 회복일 확정 포함)
+TYPES = [t.strip() for t in os.environ.get("EVENT_TYPES", "exdiv,options,futures").split(",") if t.strip()]
+
+
+# -------------------------
+# event sources (pluggable)
+# -------------------------
+def exdiv_events(payload):
+    return [{"date": d["date"], "amount": d["amount"]} for d in payload.get("dividends") or []]
+
+
+def _expiry_events(payload, kind):
+    """과거 구간은 3번째 금요일 계산, 미래/당월은 events.json 그대로"""
+    series = payload.get("series") or []
+    if not series:
+        return []
+    first = date.fromisoformat(iso_from_unix(series[0]["time"]))
+    last = date.fromisoformat(iso_from_unix(series[-1]["time"]))
+
+    out = {}
+    y, m = first.year, first.month
+    while (y, m) <= (last.year, last.month):
+        if kind == "options" or m in (3, 6, 9, 12):
+            d = third_friday(y, m).isoformat()
+            out[d] = {"date": d}
+        y, m = add_months(y, m, 1)
+
+    if os.path.exists(EVENTS_FILE):
+        with open(EVENTS_FILE, encoding="utf-8") as f:
+            for e in json.load(f).get("events") or []:
+                if e.get("type") == kind:
+                    out[e["date"]] = {"date": e["date"]}
+    return [out[d] for d in sorted(out)]
+
+
+EVENT_TYPES = {
+    "exdiv": exdiv_events,
+    "options": lambda payload: _expiry_events(payload, "options"),
+    "futures": lambda payload: _expiry_events(payload, "futures"),
+}
+
+
+# -------------------------
+# core (vectorized)
+# -------------------------
+def study_events(dates, opens, closes, events):
+    """
+    dates: 거래일 ISO 문자열 배열 (정렬)
+    events: [{"date", "amount"?}, ...]
+    return: {date: per-event dict}  — 추정/창이 안 되는 이벤트는 제외
+    """
+    n = len(closes)
+    ev_dates = np.array([e["date"] for e in events])
+    amounts = np.array([e.get("amount") or 0.0 for e in events], dtype=np.float64)
+    k = np.searchsorted(dates, ev_dates, side="left")  # 이벤트일 이후 첫 거래일
+
+    ret = np.full(n, np.nan)
+    ret[1:] = closes[1:] / closes[:-1] - 1.0
+
+    # 추정 구간 + 이벤트 전 window 가 있어야 함, 이벤트일은 데이터 안
+    ok = (k - K - EST_DAYS >= 1) & (k < n)
+    k, amounts, ev_dates = k[ok], amounts[ok], ev_dates[ok]
+    if not len(k):
+        return {}
+
+    offs = np.arange(-K, K + 1)
+    idx = k[:, None] + offs                           # (E, 2K+1)
+    in_range = idx < n
+    win = np.where(in_range, ret[np.minimum(idx, n - 1)], np.nan)
+
+    est_idx = k[:, None] - K - EST_DAYS + np.arange(EST_DAYS)
+    mu = ret[est_idx].mean(axis=1)
+    ar = win - mu[:, None]
+
+    prev_close = closes[k - 1]
+    dist_pct = amounts / prev_close * 100.0
+    ar_adj = ar.copy()
+    ar_adj[:, K] += amounts / prev_close              # 분배금 가산
+
+    gap = (prev_close - opens[k]) / np.where(amounts > 0, amounts, np.nan)
+
+    rec_idx = k[:, None] + np.arange(RECOVERY_MAX)
+    rec_in = rec_idx < n
+    recovered = np.where(rec_in, closes[np.minimum(rec_idx, n - 1)] >= prev_close[:, None], False)
+    has_rec = recovered.any(axis=1)
+    rec_days = np.where(has_rec, recovered.argmax(axis=1), -1)
+
+    out = {}
+    for j, d in enumerate(ev_dates):
+        # ±K window 가 다 찼고, 회복일도 확정(회복했거나 탐색창 전체가 데이터 안)이어야 완료
+        window_full = bool(in_range[j].all())
+        complete = window_full and bool(has_rec[j] or rec_in[j].all())
+        out[str(d)] = {
+            "date": str(d),
+            "day0": str(dates[k[j]]),
+            "complete": complete,
+            "window_full": window_full,
+            "amount": float(amounts[j]) if amounts[j] else None,
+            "dist_pct": round(float(dist_pct[j]), 4) if amounts[j] else None,
+            "ar_pct": [None if not np.isfinite(v) else round(float(v) * 100.0, 4) for v in ar[j]],
+            "ar_adj_pct": [None if not np.isfinite(v) else round(float(v) * 100.0, 4) for v in ar_adj[j]],
+            "gap_vs_dist": round(float(gap[j]), 4) if np.isfinite(gap[j]) else None,
+            # 회복 못 했는데 탐색창이 잘린 경우는 "아직 모름"(None)
+            "recovery_days": int(rec_days[j]) if has_rec[j] else (None if not rec_in[j].all() else -1),
+        }
+    return out
+
+
+def summarize(rows):
+    """캐시된 이벤트별 결과 → 타입 요약 (offset 별 평균/중앙값 AR, CAR, 갭, 회복일)"""
+    # AR/갭은 window 만 차면 확정, 회복일은 complete 인 것만
+    full = [r for r in rows if r["window_full"]]
+    out = {"events": len(rows), "complete_events": sum(1 for r in rows if r["complete"]),
+           "window_full_events": len(full), "offsets": list(range(-K, K + 1))}
+    if not full:
+        return out
+
+    def arr(key):
+        return np.array([[np.nan if v is None else v for v in r[key]] for r in full], dtype=np.float64)
+
+    for key in ("ar_pct", "ar_adj_pct"):
+        a = arr(key)
+        out[f"mean_{key}"] = [round(float(v), 4) for v in np.nanmean(a, axis=0)]
+        out[f"median_{key}"] = [round(float(v), 4) for v in np.nanmedian(a, axis=0)]
+        pre = np.nansum(a[:, :K], axis=1)
+        post = np.nansum(a[:, K:], axis=1)
+        out[f"mean_car_pre_{key}"] = round(float(pre.mean()), 4)
+        out[f"mean_car_post_{key}"] = round(float(post.mean()), 4)
+
+    gaps = np.array([r["gap_vs_dist"] for r in full if r["gap_vs_dist"] is not None], dtype=np.float64)
+    if len(gaps):
+        out["mean_gap_vs_dist"] = round(float(gaps.mean()), 4)
+        out["median_gap_vs_dist"] = round(float(np.median(gaps)), 4)
+
+    rec = [r["recovery_days"] for r in full if r["complete"] and r["recovery_days"] is not None]
+    hit = [d for d in rec if d >= 0]
+    if rec:
+        out["recovered_pct"] = round(len(hit) / len(rec) * 100.0, 1)
+    if hit:
+        out["median_recovery_days"] = float(np.median(hit))
+        out["mean_recovery_days"] = round(float(np.mean(hit)), 2)
+    return out
+
+
+# -------------------------
+# main
+# -------------------------
+def load_cache(params):
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, encoding="utf-8") as f:
+            c = json.load(f)
+        if c.get("params") == params:
+            return c
+    return {"params": params, "types": {}}
+
+
+def main():
+    with open(IN_PATH, encoding="utf-8") as f:
+        payload = json.load(f)
+    series = payload.get("series") or []
+    dates = np.array([iso_from_unix(r["time"]) for r in series])
+    opens = np.array([r["open"] for r in series], dtype=np.float64)
+    closes = np.array([r["close"] for r in series], dtype=np.float64)
+
+    # 이벤트별 결과는 이벤트 주변 가격에만 의존 → 5y 시리즈 시작일이 밀려도 캐시 유지
+    # (추정 구간이 데이터 밖으로 밀려난 옛 이벤트도 계산 당시 결과 그대로 보관)
+    params = {"version": CACHE_VERSION, "k": K, "est_days": EST_DAYS, "recovery_max": RECOVERY_MAX}
+    cache = load_cache(params)
+
+    out = {"updated_utc": utc_now(), "asof": str(dates[-1]) if len(dates) else None, "k": K,
+           "est_days": EST_DAYS, "types": {}}
+    new_total = 0
+    for name in TYPES:
+        loader = EVENT_TYPES.get(name)
+        if loader is None:
+            print(f"[WARN] unknown event type: {name}")
+            continue
+        cached = cache["types"].setdefault(name, {})
+        # 새 이벤트 + window/회복일이 미확정이던 이벤트만 다시 계산
+        todo = [e for e in loader(payload) if not (cached.get(e["date"]) or {}).get("complete")]
+        if todo:
+            fresh = study_events(dates, opens, closes, todo)
+            cached.update(fresh)
+            new_total += len(fresh)
+
+        rows = [cached[d] for d in sorted(cached)]
+        out["types"][name] = summarize(rows)
+        out["types"][name]["last_events"] = rows[-3:]
+
+    ensure_dir(os.path.dirname(OUT_FILE) or ".")
+    with open(CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+    with open(OUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ wrote {OUT_FILE} (types={','.join(out['types'])}, new/updated events={new_total})")
+
+
+if __name__ == "__main__":
+    main()
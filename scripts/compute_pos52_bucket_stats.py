@@ -20,6 +20,7 @@ from statistics import mean
 
 HISTORY_DIR = "data/history/daily"
 OUT_FILE = "data/pos52_bucket_stats.json"
+PRICE_FIELD = os.environ.get("PRICE_FIELD", "close")  # close / adj_close / tr_close (backfill_history.py 가 저장)
 
 LOOKBACK = 252      # 52주(거래일) 윈도우
 FWD_DAYS = 63       # 3개월(거래일) 앞으로 성과
@@ -37,19 +38,26 @@ BUCKETS = [
 def load_history():
     files = sorted(glob.glob(os.path.join(HISTORY_DIR, "*.json")))
     data = []
+    missing = 0
     for f in files:
         try:
             with open(f, encoding="utf-8") as fp:
                 j = json.load(fp)
-            c = j.get("close", None)
+            c = j.get(PRICE_FIELD, None)
             dt = j.get("date", None) or os.path.splitext(os.path.basename(f))[0]
             if c is None:
+                missing += 1
                 continue
             data.append({"date": dt, "close": float(c)})
         except Exception:
             # 깨진 파일은 조용히 스킵
             continue
 
+    # 다른 가격 컬럼을 요청했는데 없으면 close 로 조용히 바꾸지 않고 중단
+    if missing and PRICE_FIELD != "close":
+        raise RuntimeError(f"{missing} history files in {HISTORY_DIR} have no '{PRICE_FIELD}' "
+                           f"(run backfill_history.py to add adjusted columns).")
+
     # 날짜 정렬(파일명이 날짜면 대부분 이미 정렬이지만 안전하게)
     data.sort(key=lambda x: x["date"])
     return data
@@ -110,6 +118,7 @@ def calc():
             "history_dir": HISTORY_DIR,
             "lookback_days": LOOKBACK,
             "forward_days": FWD_DAYS,
+            "price_field": PRICE_FIELD,
             "buckets": [b[0] for b in BUCKETS],
             "min_samples": MIN_SAMPLES,
         },
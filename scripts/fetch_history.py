@@ -1,7 +1,7 @@
-import yfinance as yf
 import json
 import os
-from datetime import datetime
+
+from fetch_jepq import fetch_chart, iso_from_unix
 
 TICKER = "JEPQ"
 OUT_DIR = "data/history/daily"
@@ -9,29 +9,28 @@ OUT_DIR = "data/history/daily"
 os.makedirs(OUT_DIR, exist_ok=True)
 
 def main():
-    df = yf.download(TICKER, period="5y", interval="1d", auto_adjust=False)
-    if df.empty:
+    # Yahoo chart endpoint (fetch_layer 경유 → FETCH_MODE=record/replay 지원)
+    _, series, _ = fetch_chart(TICKER, range_="5y")
+    if not series:
         raise Exception("데이터 다운로드 실패")
 
-    df = df.reset_index()
-
-    for _, row in df.iterrows():
-        d = row["Date"].strftime("%Y-%m-%d")
+    for bar in series:
+        d = iso_from_unix(bar["time"])
         out_path = f"{OUT_DIR}/{d}.json"
 
         payload = {
             "date": d,
-            "open": float(row["Open"]),
-            "high": float(row["High"]),
-            "low": float(row["Low"]),
-            "close": float(row["Close"]),
-            "volume": int(row["Volume"])
+            "open": float(bar["open"]),
+            "high": float(bar["high"]),
+            "low": float(bar["low"]),
+            "close": float(bar["close"]),
+            "volume": int(bar["volume"])
         }
 
         with open(out_path, "w", encoding="utf-8") as f:
             json.dump(payload, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ saved {len(df)} daily files")
+    print(f"✅ saved {len(series)} daily files")
 
 if __name__ == "__main__":
     main()
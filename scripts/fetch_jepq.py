@@ -12,12 +12,18 @@ No external deps.
 - 52주 범위 0(hi==lo) 안전 처리
 """
 
-import json, os, sys, math, datetime
-from urllib.request import urlopen, Request
+import json, os, sys, math, bisect, datetime
+from collections import deque
+
+from fetch_layer import get_json  # FETCH_MODE=live/record/replay
 
 TICKER = os.environ.get("TICKER", "JEPQ").upper()
 OUT_PATH = os.environ.get("OUT_PATH", "data/jepq.json")
 HISTORY_DIR = os.environ.get("HISTORY_DIR", "history/jepq")  # 스냅샷 저장 폴더 (네 기존 유지)
+ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR", os.path.dirname(OUT_PATH) or ".")  # {ticker}_indicators.json 등 side artifact 폴더
+STATS_FIELD = os.environ.get("STATS_FIELD", "close")  # pos52 통계에 쓸 가격 컬럼: close / adj_close / tr_close
+# Yahoo chart close 는 이미 분할 반영 가격이라 기본은 split factor 를 기록만 하고 적용하지 않음
+SPLIT_ADJUST = os.environ.get("SPLIT_ADJUST", "0") == "1"
 
 UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 
@@ -25,9 +31,7 @@ UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 # helpers
 # -------------------------
 def http_json(url: str):
-  req = Request(url, headers={"User-Agent": UA})
-  with urlopen(req, timeout=30) as r:
-    return json.loads(r.read().decode("utf-8"))
+  return get_json(url, headers={"User-Agent": UA}, timeout=30)
 
 def safe_num(x):
   try:
@@ -45,6 +49,10 @@ def iso_from_unix(ts: int):
 def utc_now():
   return datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
+def side_artifact_path(ticker: str, kind: str, base_dir):
+  """{base_dir}/{ticker}_{kind}.json (base_dir 없으면 None = 파일 안 씀)"""
+  return os.path.join(base_dir, f"{ticker.lower()}_{kind}.json") if base_dir else None
+
 def ensure_dir(p):
   if p and not os.path.exists(p):
     os.makedirs(p, exist_ok=True)
@@ -52,9 +60,10 @@ def ensure_dir(p):
 # -------------------------
 # core: pos52 bucket stats
 # -------------------------
-def compute_pos52_bucket_stats(series, lookback=252, horizon=63):
+def compute_pos52_bucket_stats(series, lookback=252, horizon=63, field="close"):
   """
   series: [{"time":..., "close":...}, ...] (daily)
+  - field: 계산에 쓸 가격 컬럼 (close / adj_close / tr_close, 없으면 close)
   - pos52: 직전 252거래일(약 1년) window에서 현재 close가 어디쯤(0~100)
   - ret_3m: horizon(기본 63거래일) 뒤 수익률
   - max_dd: horizon 구간 안에서의 최대 조정(최저점 기준, 음수)
@@ -68,7 +77,7 @@ def compute_pos52_bucket_stats(series, lookback=252, horizon=63):
       "note": "not enough history"
     }
 
-  closes = [safe_num(x.get("close")) for x in series]
+  closes = [safe_num(x.get(field, x.get("close"))) for x in series]
   times  = [int(x.get("time")) for x in series]
   n = len(closes)
 
@@ -155,6 +164,7 @@ def compute_pos52_bucket_stats(series, lookback=252, horizon=63):
     "asof": iso_from_unix(times[-1]) if times else None,
     "lookback": lookback,
     "horizon": horizon,
+    "field": field,
     "buckets": out_buckets
   }
 
@@ -170,9 +180,19 @@ def pos52_bucket_key(pos52):
 # -------------------------
 # yahoo fetch
 # -------------------------
-def fetch_price_daily(ticker: str):
-  url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?range=5y&interval=1d&includePrePost=false&events=div%7Csplit"
-  j = http_json(url)
+# 로컬 stub(yahoo_stub_server.py)으로 돌릴 땐 CHART_URL=http://127.0.0.1:8765/v8/finance/chart
+CHART_URL = os.environ.get("CHART_URL", "https://query1.finance.yahoo.com/v8/finance/chart")
+
+def chart_url(ticker: str, range_: str = "5y", period1: int = None, period2: int = None):
+  """range 또는 (period1, period2) unix 초 구간으로 일봉 chart URL 생성"""
+  if period1 is not None:
+    span = f"period1={int(period1)}&period2={int(period2)}"
+  else:
+    span = f"range={range_}"
+  return f"{CHART_URL}/{ticker}?{span}&interval=1d&includePrePost=false&events=div%7Csplit"
+
+def parse_chart(j):
+  """chart 응답 → (result[0], series, dividends)"""
   result = (j.get("chart") or {}).get("result") or []
   if not result:
     raise RuntimeError("No chart result (price).")
@@ -211,6 +231,35 @@ def fetch_price_daily(ticker: str):
       dividends.append({"time": dt, "date": iso_from_unix(dt), "amount": amt})
   dividends.sort(key=lambda x: x["time"])
 
+  return r0, series, dividends
+
+def parse_splits(r0):
+  """chart result[0] → [{"time", "date", "numerator", "denominator"}, ...] (시간순)"""
+  split_events = ((r0.get("events") or {}).get("splits") or {})
+  splits = []
+  for _, sp in split_events.items():
+    dt = int(sp.get("date")) if sp.get("date") else None
+    num = safe_num(sp.get("numerator"))
+    den = safe_num(sp.get("denominator"))
+    if dt and num and den:
+      splits.append({"time": dt, "date": iso_from_unix(dt), "numerator": num, "denominator": den})
+  splits.sort(key=lambda x: x["time"])
+  return splits
+
+def fetch_chart(ticker: str, range_: str = "5y", period1: int = None, period2: int = None):
+  return parse_chart(http_json(chart_url(ticker, range_, period1, period2)))
+
+def fetch_price_daily(ticker: str, range_: str = "5y", artifact_dir: str = None):
+  """
+  artifact_dir 를 주면 ticker 별 side artifact(지표 캐시 등)를 읽고/저장.
+  None 이면 순수 loader (다른 파이프라인에서 다종목 로드용, 파일 안 씀)
+  """
+  r0, series, dividends = fetch_chart(ticker, range_)
+  splits = parse_splits(r0)
+
+  # ✅ adj_close / tr_close 컬럼 추가 (factor 는 캐시 기반 증분 갱신)
+  apply_adjustments(series, dividends, splits, cache_path=side_artifact_path(ticker, "adjust", artifact_dir))
+
   meta = r0.get("meta") or {}
   summary = {
     "asof": None,
@@ -250,8 +299,11 @@ def fetch_price_daily(ticker: str):
     "pos52_bucket": pos52_bucket_key(pos),
   }
 
+  # ✅ 거래량/변동성/ATR/낙폭/이평 (computeTone 의 volume_vs_avg_pct 포함)
+  derived.update(update_indicators(series, path=side_artifact_path(ticker, "indicators", artifact_dir)))
+
   # ✅ 여기서 바로 통계 계산해서 derived에 주입
-  derived["pos52_bucket_stats"] = compute_pos52_bucket_stats(series, lookback=252, horizon=63)
+  derived["pos52_bucket_stats"] = compute_pos52_bucket_stats(series, lookback=252, horizon=63, field=STATS_FIELD)
 
   # dividend summary (TTM)
   div_summary = {
@@ -275,6 +327,329 @@ def fetch_price_daily(ticker: str):
 
   return series, summary, derived, dividends, div_summary
 
+# -------------------------
+# indicators: 한 번의 streaming pass (running sum + deque)
+# -------------------------
+class IndicatorStream:
+  """
+  일봉을 하나씩 push 하면서 지표를 갱신.
+  상태(to_state)를 저장해두면 다음 실행 때 새 봉만 push 하면 됨.
+  - avg_volume_20/60, volume_vs_avg_pct(직전 20일 평균 대비 %), vol_vs_avg_60_pct
+  - realized_vol_20_pct: 20일 로그수익률 표준편차 연율화(%)
+  - atr_14: Wilder ATR
+  - drawdown_pct: 스트림 시작(첫 push) 이후 누적 최고 종가 대비 (%)
+  - ma_20/60/200
+  """
+  VOL_WINDOWS = (20, 60)
+  MA_WINDOWS = (20, 60, 200)
+  RV_WINDOW = 20
+  ATR_N = 14
+
+  def __init__(self):
+    self.vol = {w: deque() for w in self.VOL_WINDOWS}
+    self.vol_sum = {w: 0.0 for w in self.VOL_WINDOWS}
+    self.ma = {w: deque() for w in self.MA_WINDOWS}
+    self.ma_sum = {w: 0.0 for w in self.MA_WINDOWS}
+    self.rets = deque()
+    self.ret_sum = 0.0
+    self.ret_sq = 0.0
+    self.prev_close = None
+    self.atr = None
+    self.tr_sum = 0.0
+    self.tr_n = 0
+    self.peak = None
+    self.last_bar = None
+
+  @staticmethod
+  def _roll(dq, sums, key, x, w):
+    dq.append(x)
+    sums[key] += x
+    if len(dq) > w:
+      sums[key] -= dq.popleft()
+
+  def push(self, bar):
+    c, h, l = bar["close"], bar["high"], bar["low"]
+    v = float(bar.get("volume") or 0)
+    out = {"time": bar["time"]}
+
+    # 거래량: 비교 기준은 "오늘 제외" 직전 window 평균
+    for w in self.VOL_WINDOWS:
+      dq = self.vol[w]
+      prev_avg = self.vol_sum[w] / len(dq) if len(dq) >= w else None
+      key = "volume_vs_avg_pct" if w == 20 else f"vol_vs_avg_{w}_pct"
+      out[key] = (v / prev_avg - 1.0) * 100.0 if prev_avg else None
+      self._roll(dq, self.vol_sum, w, v, w)
+      out[f"avg_volume_{w}"] = self.vol_sum[w] / len(dq) if len(dq) >= w else None
+
+    # 실현 변동성
+    out["realized_vol_20_pct"] = None
+    if self.prev_close:
+      r = math.log(c / self.prev_close)
+      self.rets.append(r)
+      self.ret_sum += r
+      self.ret_sq += r * r
+      if len(self.rets) > self.RV_WINDOW:
+        old = self.rets.popleft()
+        self.ret_sum -= old
+        self.ret_sq -= old * old
+      k = len(self.rets)
+      if k >= self.RV_WINDOW:
+        var = (self.ret_sq - self.ret_sum * self.ret_sum / k) / (k - 1)
+        out["realized_vol_20_pct"] = math.sqrt(max(var, 0.0)) * math.sqrt(252) * 100.0
+
+    # ATR (Wilder)
+    tr = h - l if self.prev_close is None else max(h - l, abs(h - self.prev_close), abs(l - self.prev_close))
+    if self.atr is None:
+      self.tr_sum += tr
+      self.tr_n += 1
+      if self.tr_n == self.ATR_N:
+        self.atr = self.tr_sum / self.ATR_N
+    else:
+      self.atr = (self.atr * (self.ATR_N - 1) + tr) / self.ATR_N
+    out["atr_14"] = self.atr
+
+    # 누적 최고점 대비 낙폭
+    self.peak = c if self.peak is None else max(self.peak, c)
+    out["drawdown_pct"] = (c / self.peak - 1.0) * 100.0 if self.peak else None
+
+    # 이동평균
+    for w in self.MA_WINDOWS:
+      self._roll(self.ma[w], self.ma_sum, w, c, w)
+      out[f"ma_{w}"] = self.ma_sum[w] / w if len(self.ma[w]) >= w else None
+
+    self.prev_close = c
+    self.last_bar = {"time": bar["time"], "close": c, "volume": v}
+    return out
+
+  def to_state(self):
+    return {
+      "vol": {str(w): list(dq) for w, dq in self.vol.items()},
+      "ma": {str(w): list(dq) for w, dq in self.ma.items()},
+      "rets": list(self.rets),
+      "prev_close": self.prev_close,
+      "atr": self.atr,
+      "tr_sum": self.tr_sum,
+      "tr_n": self.tr_n,
+      "peak": self.peak,
+      "last_bar": self.last_bar,
+    }
+
+  @classmethod
+  def from_state(cls, st):
+    self = cls()
+    for w in self.VOL_WINDOWS:
+      self.vol[w] = deque(st["vol"][str(w)])
+      self.vol_sum[w] = sum(self.vol[w])
+    for w in self.MA_WINDOWS:
+      self.ma[w] = deque(st["ma"][str(w)])
+      self.ma_sum[w] = sum(self.ma[w])
+    self.rets = deque(st["rets"])
+    self.ret_sum = sum(self.rets)
+    self.ret_sq = sum(r * r for r in self.rets)
+    self.prev_close = st["prev_close"]
+    self.atr = st["atr"]
+    self.tr_sum = st["tr_sum"]
+    self.tr_n = st["tr_n"]
+    self.peak = st["peak"]
+    self.last_bar = st["last_bar"]
+    return self
+
+INDICATOR_COLUMNS = [
+  "avg_volume_20", "avg_volume_60", "volume_vs_avg_pct", "vol_vs_avg_60_pct",
+  "realized_vol_20_pct", "atr_14", "drawdown_pct", "ma_20", "ma_60", "ma_200",
+]
+
+def _round4(x):
+  return None if x is None else round(x, 4)
+
+def update_indicators(series, path=None):
+  """
+  side artifact(path) 는 시각 기준 append-only:
+  캐시 마지막 봉(last_bar.time)을 series 에서 bisect 로 찾아 그 뒤 봉만 push.
+  5y 창이 밀려 앞 봉이 빠져도 artifact 의 옛 컬럼은 그대로 유지.
+  마지막 봉이 series 에 없거나 값이 다르면(수정/공백) 현재 series 로 처음부터 다시 계산.
+  drawdown_pct 는 artifact 첫 봉(=처음 계산한 시점의 series 시작)부터의 최고 종가 기준.
+  path 가 None 이면 캐시 없이 전체 계산만 (파일 안 씀)
+  return: derived 에 넣을 최신 값 dict
+  """
+  if not series:
+    return {}
+
+  art = None
+  if path and os.path.exists(path):
+    try:
+      with open(path, encoding="utf-8") as f:
+        art = json.load(f)
+    except Exception:
+      art = None
+
+  start = 0
+  stream = IndicatorStream()
+  cols = {"time": []}
+  for k in INDICATOR_COLUMNS:
+    cols[k] = []
+
+  if art and art.get("state") and (art["state"].get("last_bar") or {}).get("time") is not None:
+    lb = art["state"]["last_bar"]
+    times = [r["time"] for r in series]
+    j = bisect.bisect_left(times, lb["time"])
+    if j < len(series):
+      cur = series[j]
+      if (cur["time"] == lb["time"] and cur["close"] == lb.get("close")
+          and float(cur.get("volume") or 0) == lb.get("volume")):
+        stream = IndicatorStream.from_state(art["state"])
+        cols = art["columns"]
+        start = j + 1
+
+  for bar in series[start:]:
+    row = stream.push(bar)
+    cols["time"].append(row["time"])
+    for k in INDICATOR_COLUMNS:
+      cols[k].append(_round4(row[k]))
+
+  if path:
+    ensure_dir(os.path.dirname(path) or ".")
+    with open(path, "w", encoding="utf-8") as f:
+      json.dump({
+        "updated_utc": utc_now(),
+        "rows": len(cols["time"]),
+        "columns": cols,
+        "state": stream.to_state(),
+      }, f, ensure_ascii=False, separators=(",", ":"))
+
+  latest = {k: cols[k][-1] for k in INDICATOR_COLUMNS}
+  c = series[-1]["close"]
+  latest["price_vs_ma200_pct"] = _round4((c / latest["ma_200"] - 1.0) * 100.0) if latest["ma_200"] else None
+  return latest
+
+# -------------------------
+# corporate actions: adj_close / tr_close
+# -------------------------
+def corporate_actions(series, dividends, splits):
+  """
+  분할/분배 이벤트 → [{"type", "time", "index", "factor"}, ...]
+  - index: 이벤트(ex-date)가 적용되는 첫 거래일 위치 → 그 이전 행들에 factor 를 곱함
+  - split: denominator/numerator (2:1 분할이면 이전 가격 × 0.5)
+  - div  : 1 - amount / 직전 거래일 종가
+  """
+  times = [r["time"] for r in series]
+  acts = []
+  for sp in splits:
+    k = bisect.bisect_left(times, sp["time"])
+    if 0 < k <= len(times):
+      acts.append({"type": "split", "time": sp["time"], "index": k,
+                   "factor": sp["denominator"] / sp["numerator"]})
+  for dv in dividends:
+    k = bisect.bisect_left(times, dv["time"])
+    if 0 < k <= len(times):
+      prev = series[k - 1]["close"]
+      if prev and dv["amount"] < prev:
+        acts.append({"type": "div", "time": dv["time"], "index": k,
+                     "factor": 1.0 - dv["amount"] / prev})
+  acts.sort(key=lambda a: (a["time"], a["type"]))
+  return acts
+
+def adjustment_factors(n, actions):
+  """
+  한 번의 역방향 누적곱으로 행별 (split_f, div_f) 계산.
+  i 행의 factor = index > i 인 모든 action factor 의 곱.
+  """
+  by_idx = {}
+  for a in actions:
+    by_idx.setdefault(a["index"], []).append(a)
+
+  split_f = [1.0] * n
+  div_f = [1.0] * n
+  sf = df = 1.0
+  for i in range(n - 1, -1, -1):
+    for a in by_idx.get(i + 1, ()):
+      if a["type"] == "split":
+        sf *= a["factor"]
+      else:
+        df *= a["factor"]
+    split_f[i] = sf
+    div_f[i] = df
+  return split_f, div_f
+
+def _action_key(a):
+  return (a["type"], a["time"])
+
+def update_adjustment_cache(series, actions, cache):
+  """
+  캐시는 봉 시각(times) 기준. i 행 factor 는 i 이후 action 들의 곱이라
+  - 5y 창이 밀려서 앞 행이 빠지면 캐시에서 그 앞부분만 잘라냄
+  - 캐시 마지막 봉(last_time) 뒤로 붙은 행은 factor 1 로 시작
+  - 새 action 마다 그 이전 행들에만 factor 를 한 번 곱함 (전체 재계산 X)
+  캐시와 겹치지 않거나(시리즈가 캐시보다 앞에서 시작 등) 기존 action 이 바뀌었으면 None
+  """
+  if not cache or not cache.get("times") or not series:
+    return None
+  old_times = cache["times"]
+  times = [r["time"] for r in series]
+
+  # 새 시리즈 첫 봉 = 캐시 안의 s 번째 봉, 캐시 마지막 봉 = 새 시리즈 j 번째 봉
+  s = bisect.bisect_left(old_times, times[0])
+  j = bisect.bisect_left(times, old_times[-1])
+  if s >= len(old_times) or old_times[s] != times[0]:
+    return None
+  if j >= len(times) or times[j] != old_times[-1] or j + 1 != len(old_times) - s:
+    return None
+
+  # 새 시리즈 구간(첫 봉 이후)에 걸리는 기존 action 은 그대로여야 함
+  cur = {_action_key(a): a for a in actions}
+  old = {_action_key(a): a for a in cache.get("actions") or [] if a["time"] > times[0]}
+  for k, a in old.items():
+    b = cur.get(k)
+    if b is None or abs(b["factor"] - a["factor"]) > 1e-12:
+      return None
+
+  tail = len(times) - (j + 1)
+  split_f = list(cache["split_f"][s:]) + [1.0] * tail
+  div_f = list(cache["div_f"][s:]) + [1.0] * tail
+  for k, a in cur.items():
+    if k in old:
+      continue
+    f = split_f if a["type"] == "split" else div_f
+    for i in range(a["index"]):
+      f[i] *= a["factor"]
+  return split_f, div_f
+
+def apply_adjustments(series, dividends, splits, cache_path=None):
+  """series 각 행에 adj_close / tr_close 를 채우고 factor 캐시 저장 (cache_path None 이면 캐시 없이 계산)"""
+  if not series:
+    return series
+  actions = corporate_actions(series, dividends, splits)
+
+  cache = None
+  if cache_path and os.path.exists(cache_path):
+    try:
+      with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    except Exception:
+      cache = None
+
+  factors = update_adjustment_cache(series, actions, cache)
+  if factors is None:
+    factors = adjustment_factors(len(series), actions)
+  split_f, div_f = factors
+
+  for r, sf, df in zip(series, split_f, div_f):
+    adj = r["close"] * (sf if SPLIT_ADJUST else 1.0)
+    r["adj_close"] = adj
+    r["tr_close"] = adj * df
+
+  if cache_path:
+    ensure_dir(os.path.dirname(cache_path) or ".")
+    with open(cache_path, "w", encoding="utf-8") as f:
+      json.dump({
+        "times": [r["time"] for r in series],
+        "split_adjust": SPLIT_ADJUST,
+        "actions": actions,
+        "split_f": split_f,
+        "div_f": div_f,
+      }, f, ensure_ascii=False, separators=(",", ":"))
+  return series
+
 # -------------------------
 # main
 # -------------------------
@@ -282,7 +657,7 @@ def main():
   ensure_dir(os.path.dirname(OUT_PATH) or ".")
   ensure_dir(HISTORY_DIR)
 
-  series, summary, derived, dividends, div_summary = fetch_price_daily(TICKER)
+  series, summary, derived, dividends, div_summary = fetch_price_daily(TICKER, artifact_dir=ARTIFACT_DIR)
 
   payload = {
     "ticker": TICKER,
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fetch_layer.py
+- Yahoo 등 HTTP JSON 요청을 한 곳으로 모으는 fetch 계층
+- FETCH_MODE
+    live   : 그냥 네트워크 요청 (기본)
+    record : 네트워크 요청 + 응답 원본을 FETCH_ARCHIVE(gzip JSON)에 저장
+    replay : 네트워크 없이 FETCH_ARCHIVE 에서만 응답
+             chart 요청이 key 로 정확히 안 맞으면(period1/period2 가 실행 시각에 따라
+             달라지는 경우 등) record 된 봉들을 종목 타임라인으로 합쳐서
+             yahoo_stub_server 와 같은 규칙으로 구간을 잘라 응답
+- archive key 는 host 를 뺀 "path?정렬된 query" 라서
+  CHART_URL 을 로컬 stub 서버(yahoo_stub_server.py)로 바꿔도 같은 key 로 찾음
+
+archive 형식:
+  {"version": 1, "responses": {key: <응답 JSON>}}
+"""
+
+import os
+import gzip
+import re
+import json
+import atexit
+import threading
+from urllib.parse import urlsplit, parse_qs, parse_qsl, urlencode
+from urllib.request import urlopen, Request
+
+FETCH_MODE = os.environ.get("FETCH_MODE", "live").lower()
+FETCH_ARCHIVE = os.environ.get("FETCH_ARCHIVE", "fixtures/yahoo_chart.json.gz")
+
+CHART_PATH = re.compile(r"^/v8/finance/chart/([^/]+)$")
+
+_lock = threading.Lock()
+_archive = None
+_store = None
+_dirty = False
+
+
+def archive_key(url):
+    """host 무관 key: /path?k=v&... (query 정렬)"""
+    u = urlsplit(url)
+    q = urlencode(sorted(parse_qsl(u.query, keep_blank_values=True)))
+    return f"{u.path}?{q}" if q else u.path
+
+
+def load_archive(path=None):
+    path = path or FETCH_ARCHIVE
+    if not os.path.exists(path):
+        return {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return (json.load(f) or {}).get("responses") or {}
+
+
+def save_archive(responses, path=None):
+    path = path or FETCH_ARCHIVE
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump({"version": 1, "responses": responses}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _get_archive():
+    global _archive
+    if _archive is None:
+        _archive = load_archive()
+    return _archive
+
+
+def _replay_chart(url):
+    """archive 전체를 종목 타임라인으로 합친 store 에서 chart 응답 생성 (없으면 None)"""
+    global _store
+    u = urlsplit(url)
+    m = CHART_PATH.match(u.path)
+    if not m:
+        return None
+    # yahoo_stub_server 가 이 모듈을 import 하므로 여기서 늦게 import
+    from yahoo_stub_server import build_store, chart_response
+    with _lock:
+        if _store is None:
+            _store = build_store(FETCH_ARCHIVE, "")
+        store = _store
+    code, body = chart_response(store, m.group(1), parse_qs(u.query))
+    return body if code == 200 else None
+
+
+def _flush():
+    if _dirty and _archive is not None:
+        save_archive(_archive)
+
+
+atexit.register(_flush)
+
+
+def http_get_json(url, headers=None, timeout=30):
+    req = Request(url, headers=headers or {})
+    with urlopen(req, timeout=timeout) as r:
+        return json.loads(r.read().decode("utf-8"))
+
+
+def get_json(url, headers=None, timeout=30):
+    """FETCH_MODE 에 따라 live / record / replay"""
+    global _dirty
+    if FETCH_MODE == "replay":
+        key = archive_key(url)
+        with _lock:
+            hit = _get_archive().get(key)
+        if hit is None:
+            hit = _replay_chart(url)
+        if hit is None:
+            raise RuntimeError(f"replay miss: {key} (not in {FETCH_ARCHIVE})")
+        return hit
+
+    j = http_get_json(url, headers=headers, timeout=timeout)
+    if FETCH_MODE == "record":
+        with _lock:
+            _get_archive()[archive_key(url)] = j
+            _dirty = True
+    return j
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+simulate_income.py
+- data/jepq.json 의 series / dividends 로 향후 3·6·12개월 시나리오 분포 계산
+- 일간 로그수익률을 21거래일 블록 단위로 block-bootstrap
+  · 첫 63거래일(=pos52_bucket_stats horizon)은 현재 pos52_bucket 과 같은
+    버킷에서 시작한 블록만 뽑음 (표본 부족하면 전체에서)
+  · 이후 구간은 전체 이력에서 뽑음
+- 월 분배금은 과거 "배당락 직전 종가 대비 분배율" 을 bootstrap 해서
+  매 21거래일마다 그 시점 가격 × 분배율 로 지급
+- 경로는 CHUNK 단위 numpy 배열로 만들고(메모리 상한), WORKERS>1 이면 프로세스 풀
+- 시드 고정: chunk 별 SeedSequence.spawn → 워커 수와 무관하게 같은 결과
+
+출력:
+- data/scenarios.json
+"""
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fetch_jepq import pos52_bucket_key, utc_now, ensure_dir
+import stats_np
+
+IN_PATH = os.environ.get("IN_PATH", "data/jepq.json")
+OUT_PATH = os.environ.get("SCENARIO_OUT", "data/scenarios.json")
+
+PATHS = int(os.environ.get("MC_PATHS", "20000"))
+CHUNK = int(os.environ.get("MC_CHUNK", "10000"))
+SEED = int(os.environ.get("MC_SEED", "20251218"))
+WORKERS = int(os.environ.get("WORKERS", "1"))
+
+BLOCK = 21          # 1개월(거래일) 블록
+MONTHS = 12
+COND_DAYS = 63      # 현재 버킷 조건을 적용할 초기 구간
+MIN_COND_STARTS = 30
+YIELD_LOOKBACK = 24  # 최근 N회 분배율에서 bootstrap
+HORIZONS = {"3m": 3, "6m": 6, "12m": 12}
+PCTS = [5, 25, 50, 75, 95]
+
+
+def load_payload(path=IN_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def prepare_inputs(payload):
+    series = payload.get("series") or []
+    closes = np.array([r["close"] for r in series], dtype=np.float64)
+    times = np.array([r["time"] for r in series], dtype=np.int64)
+    if len(closes) < BLOCK * 3:
+        raise RuntimeError(f"not enough history in {IN_PATH} (rows={len(closes)})")
+
+    logret = np.diff(np.log(closes))
+
+    # 블록 시작점 s 는 logret[s:s+BLOCK] 을 쓰고, 그 시점의 가격 위치는 closes[s]
+    n_starts = len(logret) - BLOCK + 1
+    all_starts = np.arange(n_starts)
+
+    bucket = ((payload.get("derived") or {}).get("pos52_bucket"))
+    pos = stats_np.pos52_array(closes, 252)
+    if bucket is None and np.isfinite(pos[-1]):
+        bucket = pos52_bucket_key(float(pos[-1]))
+
+    cond_starts = all_starts
+    if bucket is not None:
+        codes = stats_np.bucket_codes(pos[:n_starts])
+        keys = [b[0] for b in stats_np.BUCKETS_DEF]
+        hit = all_starts[codes == keys.index(bucket)] if bucket in keys else all_starts[:0]
+        if len(hit) >= MIN_COND_STARTS:
+            cond_starts = hit
+
+    # 분배율 = amount / 배당락 직전 종가
+    divs = payload.get("dividends") or []
+    d_t = np.array([d["time"] for d in divs], dtype=np.int64)
+    d_amt = np.array([d["amount"] for d in divs], dtype=np.float64)
+    k = np.searchsorted(times, d_t, side="left") - 1
+    ok = k >= 0
+    yields = (d_amt[ok] / closes[k[ok]])[-YIELD_LOOKBACK:]
+    if not len(yields):
+        yields = np.zeros(1)
+
+    return {
+        "p0": float(closes[-1]),
+        "logret": logret,
+        "all_starts": all_starts,
+        "cond_starts": cond_starts,
+        "yields": yields,
+        "bucket": bucket,
+        "conditioned": cond_starts is not all_starts,
+    }
+
+
+def simulate_chunk(args):
+    """
+    한 chunk(n_paths) 시뮬레이션.
+    return: (price[n, MONTHS], income[n, MONTHS], max_dd[n, MONTHS])  — 월말 시점 값
+    """
+    inp, n_paths, seed_seq = args
+    rng = np.random.default_rng(seed_seq)
+    n_cond = COND_DAYS // BLOCK
+
+    starts = np.empty((n_paths, MONTHS), dtype=np.int64)
+    starts[:, :n_cond] = rng.choice(inp["cond_starts"], size=(n_paths, n_cond))
+    starts[:, n_cond:] = rng.choice(inp["all_starts"], size=(n_paths, MONTHS - n_cond))
+
+    # (paths, months, BLOCK) → (paths, days)
+    r = inp["logret"][starts[:, :, None] + np.arange(BLOCK)].reshape(n_paths, MONTHS * BLOCK)
+    price = inp["p0"] * np.exp(np.cumsum(r, axis=1))
+
+    peak = np.maximum(np.maximum.accumulate(price, axis=1), inp["p0"])
+    dd = np.minimum.accumulate(price / peak - 1.0, axis=1) * 100.0
+
+    month_end = np.arange(1, MONTHS + 1) * BLOCK - 1
+    px_m = price[:, month_end]
+    y = rng.choice(inp["yields"], size=(n_paths, MONTHS))
+    income = np.cumsum(px_m * y, axis=1)
+    return px_m, income, dd[:, month_end]
+
+
+def run(inp, paths=PATHS, chunk=CHUNK, seed=SEED, workers=WORKERS):
+    sizes = [min(chunk, paths - i) for i in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(inp, n, s) for n, s in zip(sizes, seeds)]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(simulate_chunk, jobs))
+    else:
+        parts = [simulate_chunk(j) for j in jobs]
+
+    price = np.concatenate([p[0] for p in parts])
+    income = np.concatenate([p[1] for p in parts])
+    dd = np.concatenate([p[2] for p in parts])
+    return price, income, dd
+
+
+def bands(arr, nd=2):
+    """(paths, months) → {"p5": [...월별], ...}"""
+    q = np.percentile(arr, PCTS, axis=0)
+    return {f"p{p}": [round(float(v), nd) for v in row] for p, row in zip(PCTS, q)}
+
+
+def main():
+    t0 = time.perf_counter()
+    inp = prepare_inputs(load_payload())
+    price, income, dd = run(inp)
+    p0 = inp["p0"]
+
+    monthly = {
+        "month": list(range(1, MONTHS + 1)),
+        "price": bands(price),
+        "income_per_share": bands(income, 4),
+        "income_pct": bands(income / p0 * 100.0),
+        "total_return_pct": bands((price + income) / p0 * 100.0 - 100.0),
+        "max_dd_pct": bands(dd),
+    }
+    horizons = {}
+    for key, m in HORIZONS.items():
+        j = m - 1
+        horizons[key] = {name: {p: vals[j] for p, vals in b.items()}
+                         for name, b in monthly.items() if name != "month"}
+        horizons[key]["prob_loss_pct"] = round(float(np.mean(price[:, j] + income[:, j] < p0) * 100.0), 1)
+
+    out = {
+        "updated_utc": utc_now(),
+        "method": "block_bootstrap",
+        "paths": int(price.shape[0]),
+        "seed": SEED,
+        "block_days": BLOCK,
+        "start_price": round(p0, 4),
+        "pos52_bucket": inp["bucket"],
+        "conditioned_days": COND_DAYS if inp["conditioned"] else 0,
+        "conditioned_starts": int(len(inp["cond_starts"])),
+        "yield_samples": int(len(inp["yields"])),
+        "percentiles": PCTS,
+        "horizons": horizons,
+        "monthly": monthly,
+    }
+
+    ensure_dir(os.path.dirname(OUT_PATH) or ".")
+    with open(OUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ wrote {OUT_PATH} (paths={out['paths']}, bucket={inp['bucket']}, {time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print("[ERR]", str(e))
+        sys.exit(1)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stats_np.py
+- fetch_jepq.compute_pos52_bucket_stats 와 같은 정의(pos52 / ret_3m / max_dd)를
+  numpy 배열 연산으로 한 번에 계산하는 공용 헬퍼
+- 배치/다종목 분석 스크립트에서 import 해서 사용
+
+정의(기존 스크립트와 동일):
+- pos52: 직전 lookback 거래일(현재 제외) window의 min/max 기준 현재 close 위치(0~100)
+- ret_3m: horizon 거래일 뒤 수익률(%)
+- max_dd: 현재~horizon 구간(양끝 포함) 최저 종가 기준 최대조정(%, 음수)
+"""
+
+import numpy as np
+
+# fetch_jepq.compute_pos52_bucket_stats 와 같은 버킷 경계
+BUCKETS_DEF = [
+    ("p0_35",   0, 35),
+    ("p35_70",  35, 70),
+    ("p70_90",  70, 90),
+    ("p90_100", 90, 100.000001),
+]
+
+
+def rolling_min(x, w):
+    """
+    out[j] = min(x[j:j+w]), j = 0..n-w  (van Herk/Gil-Werman, O(n))
+    블록별 prefix/suffix 누적 min 두 번으로 window 크기와 무관하게 선형.
+    NaN은 그대로 전파된다.
+    """
+    return _rolling_extreme(x, w, np.minimum, np.inf)
+
+
+def rolling_max(x, w):
+    """out[j] = max(x[j:j+w]), j = 0..n-w  (O(n))"""
+    return _rolling_extreme(x, w, np.maximum, -np.inf)
+
+
+def _rolling_extreme(x, w, op, pad):
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if w <= 0 or n < w:
+        return np.empty(0)
+    if w == 1:
+        return x.copy()
+    nb = -(-n // w)
+    xp = np.full(nb * w, pad)
+    xp[:n] = x
+    blocks = xp.reshape(nb, w)
+    g = op.accumulate(blocks, axis=1).ravel()
+    h = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return op(h[: n - w + 1], g[w - 1 : n])
+
+
+def trailing_min_max(closes, lookback):
+    """
+    i 위치에 closes[i-lookback:i] 의 (min, max) 를 둔 배열 2개.
+    i < lookback 구간은 NaN. window 안에 NaN이 있으면 NaN.
+    """
+    n = len(closes)
+    lo = np.full(n, np.nan)
+    hi = np.full(n, np.nan)
+    if n <= lookback:
+        return lo, hi
+    lo[lookback:] = rolling_min(closes[:-1], lookback)
+    hi[lookback:] = rolling_max(closes[:-1], lookback)
+    return lo, hi
+
+
+def pos52_array(closes, lookback=252):
+    """전 구간 pos52 배열 (계산 불가/hi==lo 는 NaN)"""
+    lo, hi = trailing_min_max(closes, lookback)
+    rng = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pos = (closes - lo) / rng * 100.0
+    pos[~(rng > 0)] = np.nan
+    return pos
+
+
+def forward_ret_dd(closes, horizon=63):
+    """
+    i 위치에 (ret_3m, max_dd) 를 둔 배열 2개.
+    마지막 horizon 구간(미래 없음)은 NaN.
+    """
+    n = len(closes)
+    ret = np.full(n, np.nan)
+    dd = np.full(n, np.nan)
+    if n <= horizon:
+        return ret, dd
+    cur = closes[: n - horizon]
+    fut = closes[horizon:]
+    fwd_min = rolling_min(closes, horizon + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret[: n - horizon] = (fut - cur) / cur * 100.0
+        dd[: n - horizon] = (fwd_min - cur) / cur * 100.0
+    return ret, dd
+
+
+def rolling_sum(x, w):
+    """
+    out[i] = sum(x[i-w+1:i+1]) (끝 정렬), i < w-1 은 NaN — cumsum 차분으로 O(n)
+    window 안에 NaN 이 하나라도 있으면 NaN (cumsum 전체가 오염되지 않게 따로 셈)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) < w:
+        return out
+    bad = np.isnan(x)
+    c = np.concatenate(([0.0], np.cumsum(np.where(bad, 0.0, x))))
+    out[w - 1:] = c[w:] - c[:-w]
+    if bad.any():
+        b = np.concatenate(([0], np.cumsum(bad)))
+        out[w - 1:][(b[w:] - b[:-w]) > 0] = np.nan
+    return out
+
+
+def moving_average(x, w):
+    """끝 정렬 단순이동평균 (i < w-1 은 NaN)"""
+    return rolling_sum(x, w) / w
+
+
+def realized_vol(closes, w=20):
+    """끝 정렬 w일 로그수익률 표본표준편차 연율화(%) — 합/제곱합 rolling 으로 O(n)"""
+    closes = np.asarray(closes, dtype=np.float64)
+    r = np.full(len(closes), np.nan)
+    r[1:] = np.log(closes[1:] / closes[:-1])
+    s1 = rolling_sum(r, w)
+    s2 = rolling_sum(r * r, w)
+    var = (s2 - s1 * s1 / w) / (w - 1)
+    return np.sqrt(np.maximum(var, 0.0)) * np.sqrt(252) * 100.0
+
+
+def pos52_rows(closes, lookback=252, horizon=63):
+    """
+    기존 스크립트의 rows(list of dict) 대신 배열 묶음 반환.
+    return: (idx, pos52, ret_3m, max_dd)  — 모두 유효한 행만
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    pos = pos52_array(closes, lookback)
+    ret, dd = forward_ret_dd(closes, horizon)
+    ok = np.isfinite(pos) & np.isfinite(ret) & np.isfinite(dd) & (closes != 0)
+    ok[:lookback] = False
+    idx = np.flatnonzero(ok)
+    return idx, pos[idx], ret[idx], dd[idx]
+
+
+def bucket_codes(pos52, buckets_def=BUCKETS_DEF):
+    """pos52 → 버킷 정수 코드 (범위 밖은 -1)"""
+    edges = np.array([b[1] for b in buckets_def] + [buckets_def[-1][2]], dtype=np.float64)
+    code = np.searchsorted(edges, pos52, side="right") - 1
+    code[(code < 0) | (code >= len(buckets_def))] = -1
+    return code
+
+
+def bucket_stats(pos52, ret_3m, max_dd, buckets_def=BUCKETS_DEF):
+    """
+    fetch_jepq.compute_pos52_bucket_stats 의 "buckets" 와 같은 모양으로 집계.
+    버킷별 list comprehension 대신 bincount 한 번으로 처리.
+    """
+    k = len(buckets_def)
+    code = bucket_codes(pos52, buckets_def)
+    m = code >= 0
+    code, ret_3m, max_dd = code[m], ret_3m[m], max_dd[m]
+
+    cnt = np.bincount(code, minlength=k)
+    sum_ret = np.bincount(code, weights=ret_3m, minlength=k)
+    sum_dd = np.bincount(code, weights=max_dd, minlength=k)
+    worst = np.full(k, np.inf)
+    np.minimum.at(worst, code, max_dd)
+
+    out = {}
+    for j, (key, a, b) in enumerate(buckets_def):
+        c = int(cnt[j])
+        out[key] = {
+            "range": [a, b if b <= 100 else 100],
+            "sample_size": c,
+            "avg_ret_3m": round(float(sum_ret[j] / c), 2) if c else None,
+            "avg_max_dd": round(float(sum_dd[j] / c), 2) if c else None,
+            "worst_max_dd": round(float(worst[j]), 2) if c else None,
+        }
+    return out
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+yahoo_stub_server.py
+- Yahoo chart endpoint(/v8/finance/chart/{ticker}) 를 흉내 내는 로컬 HTTP 서버
+- 오프라인/무지연 파이프라인 실행, 벤치마크, CI 용
+- 데이터 소스 (둘 다 읽어서 종목별로 타임라인 병합)
+    · FETCH_ARCHIVE: fetch_layer record 모드로 저장한 gzip archive
+    · STUB_SOURCE_DIR/{ticker}.json: fetch_jepq.py 출력 형식(series/dividends)
+- 지원 파라미터: range(1d~max, ytd) / period1,period2 / events(div, split)
+  range 는 "데이터의 마지막 봉" 기준이라 실행 시점과 무관하게 결과가 같음
+
+실행:
+  STUB_PORT=8765 python scripts/yahoo_stub_server.py
+  CHART_URL=http://127.0.0.1:8765/v8/finance/chart python scripts/fetch_jepq.py
+"""
+
+import os
+import re
+import glob
+import json
+import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from fetch_layer import load_archive, FETCH_ARCHIVE
+
+STUB_HOST = os.environ.get("STUB_HOST", "127.0.0.1")
+STUB_PORT = int(os.environ.get("STUB_PORT", "8765"))
+STUB_SOURCE_DIR = os.environ.get("STUB_SOURCE_DIR", "")
+
+DAY = 24 * 60 * 60
+RANGE_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+CHART_PATH = re.compile(r"^/v8/finance/chart/([^/]+)$")
+
+
+# -------------------------
+# store
+# -------------------------
+def _empty():
+    return {"bars": {}, "dividends": {}, "splits": {}, "meta": {}}
+
+
+def add_chart_response(store, j):
+    """record 된 chart 응답 하나를 종목 타임라인에 병합"""
+    for r0 in (j.get("chart") or {}).get("result") or []:
+        meta = r0.get("meta") or {}
+        sym = (meta.get("symbol") or "").upper()
+        if not sym:
+            continue
+        st = store.setdefault(sym, _empty())
+        for k in ("currency", "exchangeName", "instrumentType", "firstTradeDate", "timezone", "exchangeTimezoneName"):
+            if meta.get(k) is not None:
+                st["meta"][k] = meta[k]
+
+        ts = r0.get("timestamp") or []
+        q = ((r0.get("indicators") or {}).get("quote") or [{}])[0]
+        for i, t in enumerate(ts):
+            bar = {k: (q.get(k) or [None] * len(ts))[i] for k in ("open", "high", "low", "close", "volume")}
+            st["bars"][int(t)] = bar
+        ev = r0.get("events") or {}
+        for k, dv in (ev.get("dividends") or {}).items():
+            st["dividends"][int(dv.get("date") or k)] = dv
+        for k, sp in (ev.get("splits") or {}).items():
+            st["splits"][int(sp.get("date") or k)] = sp
+
+
+def add_payload(store, ticker, payload):
+    """fetch_jepq.py 출력(series/dividends) 을 타임라인에 병합"""
+    st = store.setdefault(ticker.upper(), _empty())
+    for r in payload.get("series") or []:
+        st["bars"][int(r["time"])] = {k: r.get(k) for k in ("open", "high", "low", "close", "volume")}
+    for d in payload.get("dividends") or []:
+        st["dividends"][int(d["time"])] = {"amount": d["amount"], "date": int(d["time"])}
+
+
+def build_store(archive_path=FETCH_ARCHIVE, source_dir=STUB_SOURCE_DIR):
+    store = {}
+    for j in load_archive(archive_path).values():
+        add_chart_response(store, j)
+    if source_dir:
+        for f in sorted(glob.glob(os.path.join(source_dir, "*.json"))):
+            with open(f, encoding="utf-8") as fp:
+                payload = json.load(fp)
+            if isinstance(payload, dict) and payload.get("series"):
+                add_payload(store, payload.get("ticker") or os.path.splitext(os.path.basename(f))[0], payload)
+    # 시간순 정렬 리스트로 고정
+    for st in store.values():
+        st["times"] = sorted(st["bars"])
+        if st["times"]:
+            st["meta"].setdefault("firstTradeDate", st["times"][0])
+    return store
+
+
+# -------------------------
+# response
+# -------------------------
+def resolve_span(times, params):
+    last = times[-1] if times else 0
+    if "period1" in params:
+        p1 = int(params["period1"][0])
+        p2 = int(params.get("period2", [last + DAY])[0])
+        return p1, p2
+    rng = params.get("range", ["1mo"])[0]
+    if rng == "max":
+        return 0, last + 1
+    if rng == "ytd":
+        y = datetime.datetime.utcfromtimestamp(last).year
+        return int(datetime.datetime(y, 1, 1, tzinfo=datetime.timezone.utc).timestamp()), last + 1
+    if rng not in RANGE_DAYS:
+        raise ValueError(f"Invalid range: {rng}")
+    return last - RANGE_DAYS[rng] * DAY, last + 1
+
+
+def chart_response(store, ticker, params):
+    st = store.get(ticker.upper())
+    if not st or not st["times"]:
+        return 404, {"chart": {"result": None, "error": {"code": "Not Found", "description": "No data found, symbol may be delisted"}}}
+    if params.get("interval", ["1d"])[0] != "1d":
+        return 400, {"chart": {"result": None, "error": {"code": "Bad Request", "description": "stub supports interval=1d only"}}}
+    try:
+        p1, p2 = resolve_span(st["times"], params)
+    except ValueError as e:
+        return 400, {"chart": {"result": None, "error": {"code": "Unprocessable Entity", "description": str(e)}}}
+
+    ts = [t for t in st["times"] if p1 <= t < p2]
+    quote = {k: [st["bars"][t][k] for t in ts] for k in ("open", "high", "low", "close", "volume")}
+
+    # 52주 고저는 마지막 봉 기준 1년
+    yr = [t for t in ts if t >= (ts[-1] - 365 * DAY)] if ts else []
+    highs = [st["bars"][t]["high"] for t in yr if st["bars"][t]["high"] is not None]
+    lows = [st["bars"][t]["low"] for t in yr if st["bars"][t]["low"] is not None]
+    meta = dict(st["meta"])
+    meta.update({
+        "symbol": ticker.upper(),
+        "dataGranularity": "1d",
+        "regularMarketPrice": quote["close"][-1] if ts else None,
+        "fiftyTwoWeekHigh": max(highs) if highs else None,
+        "fiftyTwoWeekLow": min(lows) if lows else None,
+    })
+
+    r0 = {"meta": meta, "timestamp": ts, "indicators": {"quote": [quote]}}
+    events_q = params.get("events", [""])[0]
+    events = {}
+    if "div" in events_q:
+        divs = {str(t): dv for t, dv in st["dividends"].items() if p1 <= t < p2}
+        if divs:
+            events["dividends"] = divs
+    if "split" in events_q:
+        sps = {str(t): sp for t, sp in st["splits"].items() if p1 <= t < p2}
+        if sps:
+            events["splits"] = sps
+    if events:
+        r0["events"] = events
+    return 200, {"chart": {"result": [r0], "error": None}}
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            u = urlsplit(self.path)
+            m = CHART_PATH.match(u.path)
+            if not m:
+                code, body = 404, {"error": "not found"}
+            else:
+                code, body = chart_response(store, m.group(1), parse_qs(u.query))
+            raw = json.dumps(body, separators=(",", ":")).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, fmt, *args):
+            # 벤치마크 중 stdout 소음 방지
+            pass
+
+    return Handler
+
+
+def serve(host=STUB_HOST, port=STUB_PORT, store=None):
+    store = store if store is not None else build_store()
+    httpd = ThreadingHTTPServer((host, port), make_handler(store))
+    return httpd
+
+
+def main():
+    store = build_store()
+    httpd = serve(store=store)
+    host, port = httpd.server_address[:2]
+    print(f"[OK] yahoo stub on http://{host}:{port}/v8/finance/chart "
+          f"(tickers={','.join(sorted(store)) or '-'})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()